@@ -0,0 +1,112 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:file: ElementsKernel/AsyncPath.py
+
+:date: Oct 18, 2026
+
+Coroutine versions of the ElementsKernel.Path lookups. They are kept out of
+the Path module, which is imported by every program, because the coroutine
+syntax needs Python 3.5 and the running loop lookup Python 3.7.
+
+'''
+
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ElementsKernel import Path
+
+ASYNC_WORKERS = 8
+
+
+async def agetPath(file_name, file_type="executable", raise_exception=True, use_index=None):
+    """
+    Coroutine version of getPath. The locations are probed concurrently
+    in a bounded thread pool and the first match in the location order
+    wins. It shares the lookup cache, the indexes and the manifests with
+    getPath.
+    """
+
+    lookup = Path.PathLookup(file_name, file_type, use_index)
+
+    if not lookup.isCached():
+        loop = asyncio.get_running_loop()
+        executor = _getAsyncExecutor()
+        resolver = lookup.getResolver()
+        if resolver is not None:
+            lookup.setResult(await loop.run_in_executor(executor, resolver, file_name))
+        else:
+            location_list = await loop.run_in_executor(executor, Path.getLocations, file_type)
+            lookup.setResult(await _agetPathFromLocations(file_name, location_list))
+
+    return lookup.getResult(raise_exception)
+
+
+async def agetAllPathFromLocations(file_name, locations, index=None):
+    """
+    Coroutine version of getAllPathFromLocations. The locations are
+    probed concurrently in a bounded thread pool and the result keeps
+    the location order.
+    """
+
+    loop = asyncio.get_running_loop()
+    executor = _getAsyncExecutor()
+
+    if index is not None:
+        return await loop.run_in_executor(executor, index.getAllPathFromLocations, file_name, locations)
+
+    found = await asyncio.gather(*[loop.run_in_executor(executor, Path.pathExists, l, file_name)
+                                   for l in locations])
+
+    return Path.removeDuplicates(os.path.join(l, file_name) for l, f in zip(locations, found) if f)
+
+
+async def _agetPathFromLocations(file_name, locations):
+    """ Probe all the locations concurrently and return the first match
+    in the location order. The probes that are not needed anymore are
+    cancelled. """
+    loop = asyncio.get_running_loop()
+    executor = _getAsyncExecutor()
+    futures = [loop.run_in_executor(executor, Path.pathExists, l, file_name) for l in locations]
+    result = None
+    try:
+        for l, future in zip(locations, futures):
+            if await future:
+                result = os.path.join(l, file_name)
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+    return result
+
+
+def _getAsyncExecutor():
+    """ Get the thread pool shared by the coroutines of the module """
+    global _async_executor  # pylint: disable=global-statement
+    with _async_lock:
+        if _async_executor is None:
+            _async_executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS)
+        return _async_executor
+
+
+_async_executor = None
+
+_async_lock = threading.Lock()
@@ -23,8 +23,16 @@
 
 '''
 
+import os
+import json
+import hashlib
+
 from ElementsKernel.Path import getLocations, getPath
 
+CACHE_DIR_VAR = "ELEMENTS_CONF_CACHE_DIR"
+# maximum number of entries of the cache, the oldest ones are removed
+CACHE_MAX_ENTRIES = 256
+
 
 def getConfigurationLocations(exist_only=False):
     """
@@ -39,3 +47,88 @@ def getConfigurationPath(file_name, raise_exception=True):
     """
     return getPath(file_name, "configuration", raise_exception)
 
+
+def getConfigurationCacheDir():
+    """
+    Get the directory of the cached configuration files. The cache is only
+    used if the ELEMENTS_CONF_CACHE_DIR environment variable is set, None is
+    returned otherwise
+    """
+    return os.environ.get(CACHE_DIR_VAR, "") or None
+
+
+def pruneConfigurationCache(cache_dir, max_entries=CACHE_MAX_ENTRIES):
+    """
+    Remove the least recently written entries of the cache above the maximum
+    number. The errors are silently ignored
+    """
+    try:
+        entries = [os.path.join(cache_dir, e) for e in os.listdir(cache_dir) if e.endswith(".json")]
+        if len(entries) <= max_entries:
+            return
+        entries.sort(key=os.path.getmtime)
+        for entry in entries[:len(entries) - max_entries]:
+            os.remove(entry)
+    except (IOError, OSError):
+        pass
+
+
+def _getConfigurationCacheFile(config_file, signature):
+    """
+    Get the path of the cache entry for the configuration file. The key is
+    made of the path, the size, the modification time of the file and the
+    parser signature
+    """
+    cache_dir = getConfigurationCacheDir()
+    if not cache_dir:
+        return None
+    try:
+        st = os.stat(config_file)
+    except OSError:
+        return None
+    # st_mtime_ns does not exist with Python 2
+    mtime = getattr(st, "st_mtime_ns", st.st_mtime)
+    key = "\0".join([os.path.realpath(config_file), str(st.st_size),
+                      repr(mtime), str(st.st_ino), signature])
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+
+def readConfigurationCache(config_file, signature):
+    """
+    Get the cached list of tokens of the configuration file or None if the
+    file is not in the cache
+    """
+    cache_file = _getConfigurationCacheFile(config_file, signature)
+    if not cache_file:
+        return None
+    try:
+        with open(cache_file) as f:
+            tokens = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(tokens, list):
+        return None
+    return tokens
+
+
+def writeConfigurationCache(config_file, signature, tokens):
+    """
+    Store the list of tokens of the configuration file in the cache. The
+    errors are silently ignored
+    """
+    cache_file = _getConfigurationCacheFile(config_file, signature)
+    if not cache_file:
+        return
+    tmp_file = "%s.%d.tmp" % (cache_file, os.getpid())
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        with open(tmp_file, "w") as f:
+            json.dump(tokens, f)
+        os.rename(tmp_file, cache_file)
+    except (IOError, OSError):
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return
+    pruneConfigurationCache(os.path.dirname(cache_file))
@@ -0,0 +1,415 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+"""
+:file: python/ElementsKernel/ForkServer.py
+
+:date: Oct 18, 2026
+
+Pre-warmed launcher for the Elements Python programs. The server pre-imports
+the ElementsKernel.Program module and a list of heavy modules and listens on
+a local Unix socket. For each request, it forks a child which takes over the
+standard streams, the environment, the working directory and the arguments
+of the client and runs the Program.runProgram method.
+
+The client part (runProgramInServer) is used by the generated program
+scripts. It only uses light modules and returns None if no server is
+running, in which case the script runs the program by itself.
+
+The client sends its environment and its standard streams to the server:
+the socket and its directory must belong to the user and be private, and
+the server must run as the same user. The server refuses the
+requests of the clients using another ElementsKernel package than the
+preloaded one.
+"""
+
+import os
+import sys
+import json
+import stat
+import array
+import signal
+import socket
+import struct
+
+SOCKET_VAR = "ELEMENTS_FORK_SERVER_SOCKET"
+DISABLE_VAR = "ELEMENTS_FORK_SERVER_DISABLE"
+PRELOAD_VAR = "ELEMENTS_FORK_SERVER_PRELOAD"
+SOCKET_NAME = "ElementsForkServer.sock"
+
+_BUFFER_SIZE = 65536
+
+# seconds given to a client to send its request
+_REQUEST_TIMEOUT = 5.0
+
+
+def getSocketPath():
+    """ Get the path of the server socket. It is given by the
+    ELEMENTS_FORK_SERVER_SOCKET environment variable or it is placed in a
+    private per user directory """
+    socket_path = os.environ.get(SOCKET_VAR, "")
+    if socket_path:
+        return socket_path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", "")
+    if not runtime_dir:
+        runtime_dir = os.path.join(os.environ.get("TMPDIR", "/tmp"), "elements-%d" % os.getuid())
+    return os.path.join(runtime_dir, SOCKET_NAME)
+
+
+def checkPrivatePath(path, file_type):
+    """ Check that the path is of the given type (stat.S_ISDIR, stat.S_ISSOCK,
+    ...), that it belongs to the user and that the group and the others have
+    no access to it. The symbolic links are not followed """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return file_type(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+
+def _getPeerUid(sock):
+    """ Get the user id of the process at the other end of the socket or
+    None if it is not supported by the platform """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+
+def _getKernelLocation():
+    """ Get the location of the ElementsKernel package of this process """
+    return os.path.dirname(os.path.realpath(os.path.abspath(__file__)))
+
+
+def _sendFds(sock, data, fds):
+    """ Send the data with the file descriptors (socket.send_fds only
+    exists since Python 3.9) """
+    return sock.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))])
+
+
+def _receiveFds(sock, buffer_size, max_fds):
+    """ Receive data and at most max_fds file descriptors """
+    fds = array.array("i")
+    data, ancillary, _, _ = sock.recvmsg(buffer_size, socket.CMSG_LEN(max_fds * fds.itemsize))
+    for level, kind, cmsg_data in ancillary:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(cmsg_data[:len(cmsg_data) - (len(cmsg_data) % fds.itemsize)])
+    return data, list(fds)
+
+
+def _sendMessage(sock, message):
+    """ Send a JSON message terminated by a newline """
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+
+def _receiveMessage(sock, data=b""):
+    """ Receive a JSON message terminated by a newline. None is returned if
+    the connection is closed before the end of the message """
+    while b"\n" not in data:
+        chunk = sock.recv(_BUFFER_SIZE)
+        if not chunk:
+            return None, data
+        data += chunk
+    line, data = data.split(b"\n", 1)
+    return json.loads(line.decode()), data
+
+
+def runProgramInServer(app_module, program_kwargs, socket_path=None):
+    """ Run the program in a child of the fork server
+
+    :param app_module: the name of the module of the program
+    :param program_kwargs: the keyword arguments of the Program class
+    :param socket_path: the path of the server socket. The default comes
+        from getSocketPath
+    :return: the exit code of the program or None if the server is not
+        available
+    """
+    if os.environ.get(DISABLE_VAR, ""):
+        return None
+    # the file descriptors passing and the peer check are needed (Python 3
+    # on Linux)
+    if not hasattr(socket.socket, "sendmsg") or not hasattr(socket, "SO_PEERCRED"):
+        return None
+    if socket_path is None:
+        socket_path = getSocketPath()
+    if not os.path.exists(socket_path):
+        return None
+    # the environment is only sent to a private socket of the user
+    if not checkPrivatePath(os.path.dirname(os.path.abspath(socket_path)), stat.S_ISDIR) \
+            or not checkPrivatePath(socket_path, stat.S_ISSOCK):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        peer_uid = _getPeerUid(sock)
+    except (IOError, OSError):
+        sock.close()
+        return None
+    if peer_uid is not None and peer_uid != os.getuid():
+        sock.close()
+        return None
+
+    request = {"module": app_module,
+               "kwargs": program_kwargs,
+               "argv": sys.argv,
+               "env": dict(os.environ),
+               "cwd": os.getcwd(),
+               "sys_path": sys.path,
+               "kernel": _getKernelLocation()}
+
+    for stream in (sys.stdout, sys.stderr):
+        stream.flush()
+
+    child_pid = None
+    old_handlers = {}
+
+    def forwardSignal(signum, _):
+        if child_pid:
+            os.kill(child_pid, signum)
+
+    try:
+        _sendFds(sock, json.dumps(request).encode() + b"\n", [0, 1, 2])
+        # the server is committed to run the program once it has sent the
+        # pid of the child
+        message, data = _receiveMessage(sock)
+        if message is None or "pid" not in message:
+            return None
+        child_pid = message["pid"]
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            old_handlers[signum] = signal.signal(signum, forwardSignal)
+        message, data = _receiveMessage(sock, data)
+    except (IOError, OSError, ValueError):
+        if child_pid is None:
+            return None
+        message = None
+    finally:
+        for signum, handler in old_handlers.items():
+            signal.signal(signum, handler)
+        sock.close()
+
+    if message is None:
+        # the child has died without reporting its exit code
+        return 1
+    return message.get("exit_code", 1)
+
+
+def _checkPeer(conn):
+    """ Only accept the connections of the same user """
+    uid = _getPeerUid(conn)
+    return uid is None or uid == os.getuid()
+
+
+def _runChild(conn, request, fds):
+    """ Run the requested program in the forked child. This function never
+    returns """
+    exit_code = 1
+    try:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.environ.clear()
+        os.environ.update(request["env"])
+        os.chdir(request["cwd"])
+        sys.argv = request["argv"]
+        sys.path = request["sys_path"]
+        _clearPathCaches()
+        _sendMessage(conn, {"pid": os.getpid()})
+
+        from ElementsKernel.Program import Program
+        program = Program(request["module"], **request["kwargs"])
+        try:
+            exit_code = program.runProgram()
+        except SystemExit as e:
+            exit_code = e.code
+        if exit_code is not None and not isinstance(exit_code, int):
+            exit_code = 1
+    except BaseException:  # pylint: disable=broad-except
+        import traceback
+        traceback.print_exc()
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except (IOError, OSError, ValueError):
+                pass
+        try:
+            _sendMessage(conn, {"exit_code": exit_code})
+        except (IOError, OSError):
+            pass
+        os._exit(0)  # pylint: disable=protected-access
+
+
+def _clearPathCaches():
+    """ Forget the lookups made by the server process: they can be
+    outdated and they depend on its environment """
+    from ElementsKernel import Path
+    Path.clearLocationCache()
+    Path.clearManifestCache()
+    Path.invalidateLookupCache()
+
+
+def _reapChildren():
+    """ Collect the terminated children """
+    try:
+        while os.waitpid(-1, os.WNOHANG)[0]:
+            pass
+    except ChildProcessError:
+        pass
+
+
+def _handleConnection(server, conn, logger):
+    """ Receive a request and fork the child running it """
+    fds = []
+    try:
+        if not _checkPeer(conn):
+            logger.warning("Connection of another user refused")
+            return
+        # a stalled client must not block the server
+        conn.settimeout(_REQUEST_TIMEOUT)
+        try:
+            data, fds = _receiveFds(conn, _BUFFER_SIZE, 3)
+            request, _ = _receiveMessage(conn, data)
+        except (IOError, OSError, ValueError) as e:
+            logger.warning("Invalid request received: %s", e)
+            return
+        if request is None or len(fds) != 3:
+            logger.warning("Incomplete request received")
+            return
+        conn.settimeout(None)
+        if request.get("kernel", None) != _getKernelLocation():
+            # the client falls back to running the program by itself
+            logger.info("Request of %s refused: it uses the ElementsKernel package of %s",
+                        request["argv"][0], request.get("kernel", None))
+            _sendMessage(conn, {"refused": "ElementsKernel mismatch"})
+            return
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        pid = os.fork()
+        if pid == 0:
+            server.close()
+            _runChild(conn, request, fds)
+        logger.debug("Started %s for %s in process %d", request["module"], request["argv"][0], pid)
+    finally:
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+
+
+def preloadModules(module_names, logger):
+    """ Import the modules to be shared by all the children """
+    import importlib
+    for name in module_names:
+        try:
+            importlib.import_module(name)
+            logger.info("Preloaded %s", name)
+        except ImportError as e:
+            logger.warning("The %s module cannot be preloaded: %s", name, e)
+
+
+def createServerSocket(socket_path):
+    """ Create the listening socket. The parent directory is created with
+    private permissions and a stale socket is removed. An existing parent
+    directory must belong to the user and be private """
+    socket_dir = os.path.dirname(os.path.abspath(socket_path))
+    if not os.path.lexists(socket_dir):
+        os.makedirs(socket_dir, 0o700)
+        os.chmod(socket_dir, 0o700)
+    if not checkPrivatePath(socket_dir, stat.S_ISDIR):
+        raise Exception("The \"%s\" directory must belong to the user and have the 0700 mode" % socket_dir)
+    if os.path.lexists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            raise Exception("A server is already listening on \"%s\"" % socket_path)
+        except (IOError, OSError):
+            os.remove(socket_path)
+        finally:
+            probe.close()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(128)
+    return server
+
+
+def defineSpecificProgramOptions():
+    """
+    @brief Allows to define the (command line and configuration file) options
+    specific to this program
+
+    @details
+        See the Elements documentation for more details.
+    @return
+        An  ArgumentParser.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--socket', default=None,
+                        help='Path of the server socket (default: %s or a per user path)' % SOCKET_VAR)
+
+    parser.add_argument('--preload', default=[], action='append',
+                        help='Module to import before serving. It can be repeated. '
+                             'The comma separated %s variable is also used' % PRELOAD_VAR)
+
+    return parser
+
+
+def mainMethod(args):
+    """ The "main" method.
+    This method is the entry point to the program. In this sense, it is
+    similar to a main (and it is why it is called mainMethod()).
+    """
+    import ElementsKernel.Logging as log
+    from ElementsKernel import Exit
+
+    logger = log.getLogger('ElementsForkServer')
+
+    socket_path = args.socket or getSocketPath()
+
+    module_names = ["ElementsKernel.Program"] + args.preload
+    module_names += [m for m in os.environ.get(PRELOAD_VAR, "").split(",") if m]
+    preloadModules(module_names, logger)
+
+    try:
+        server = createServerSocket(socket_path)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("%s", e)
+        return Exit.Code["UNAVAILABLE"]
+
+    logger.info("Listening on %s", socket_path)
+    try:
+        while True:
+            conn, _ = server.accept()
+            _handleConnection(server, conn, logger)
+            _reapChildren()
+    except KeyboardInterrupt:
+        logger.info("Stopping the server")
+    finally:
+        server.close()
+        os.remove(socket_path)
+
+    return Exit.Code["OK"]
@@ -25,6 +25,13 @@
 
 import os
 import argparse
+import fnmatch
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue  # pylint: disable=import-error
+
 import ElementsKernel.Logging as log
 
 from ElementsKernel import Path, Exit
@@ -59,13 +66,33 @@ def defineSpecificProgramOptions():
     parser.add_argument('-d', '--with-defaults',
                         default=False,
                         action="store_true",
-                        help='Add the system internal paths to the environment for the lookup')
+                        help='Add the system internal paths (and the linker cache for the libraries) '
+                        'to the environment for the lookup')
 
     parser.add_argument('-t', '--type',
                         default=DEFAULT_TYPE,
                         choices=TYPES,
                         help='The type of file to search for [default: %s]' % DEFAULT_TYPE)
 
+    parser.add_argument('-m', '--max-depth',
+                        type=int,
+                        default=None,
+                        help='Maximum depth of the sub-directories listed when no stem is provided')
+
+    parser.add_argument('-g', '--glob',
+                        default=None,
+                        help='Only list the file names matching the glob pattern when no stem is provided')
+
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        default=8,
+                        help='Number of locations listed concurrently when no stem is provided [default: 8]')
+
+    parser.add_argument('-i', '--use-index',
+                        default=False,
+                        action="store_true",
+                        help='Use the cached directory listings of the file type for the lookup')
+
     return parser
 
 
@@ -83,6 +110,124 @@ def selfFilter(f_list, only_self):
     return f_list
 
 
+def _depth(rel_path):
+    """ number of sub-directories in a relative path """
+    return rel_path.count(os.sep)
+
+
+def listLocation(location, put, index=None, max_depth=None, pattern=None):
+    """
+    @brief list all the files below a location.
+    @details The files are passed by chunks (one per directory) to the
+    put callable. The symbolic links to directories are not followed.
+    @param max_depth: maximum number of sub-directory levels
+    @param pattern: glob pattern that the file names have to match
+    """
+
+    def keep(rel_path):
+        return ((max_depth is None or _depth(rel_path) <= max_depth) and
+                (pattern is None or fnmatch.fnmatch(os.path.basename(rel_path), pattern)))
+
+    manifest = Path.getManifest(location)
+    file_list = manifest.listFiles() if manifest is not None else None
+    if file_list is None and index is not None:
+        file_list = index.listFiles(location)
+    if file_list is not None:
+        put([f for f in file_list if keep(os.path.relpath(f, location))])
+        return
+
+    dir_list = [(location, 0)]
+    while dir_list:
+        dir_path, depth = dir_list.pop()
+        file_list = []
+        try:
+            entries = _listEntries(dir_path)
+        except OSError:
+            continue
+        for name, entry_path, is_dir, is_link in entries:
+            if is_dir and not is_link:
+                if max_depth is None or depth < max_depth:
+                    dir_list.append((entry_path, depth + 1))
+            elif is_dir:
+                continue
+            elif pattern is None or fnmatch.fnmatch(name, pattern):
+                file_list.append(entry_path)
+        if file_list:
+            put(file_list)
+
+
+def _listEntries(dir_path):
+    """ Get the (name, path, is_dir, is_link) tuples of the entries of a
+    directory. is_dir follows the symbolic links """
+    if not hasattr(os, "scandir"):
+        # Python 2
+        entries = []
+        for name in os.listdir(dir_path):
+            entry_path = os.path.join(dir_path, name)
+            entries.append((name, entry_path, os.path.isdir(entry_path), os.path.islink(entry_path)))
+        return entries
+    return [(entry.name, entry.path, entry.is_dir(), entry.is_symlink()) for entry in os.scandir(dir_path)]
+
+
+def streamLocations(locations, only_self, jobs=8, index=None, max_depth=None, pattern=None):
+    """
+    @brief list concurrently all the files below the locations
+    and print them as soon as they are found.
+    @details The files of a location are printed after the ones of
+    the previous locations: the chunks of the next locations are kept
+    until then.
+    @return the number of printed files.
+    """
+
+    file_count = [0]
+
+    def printChunk(chunk):
+        for f in selfFilter(chunk, only_self):
+            print(f)
+            file_count[0] += 1
+
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+    except ImportError:
+        # Python 2: the locations are listed one after the other
+        for l in locations:
+            listLocation(l, printChunk, index, max_depth, pattern)
+        return file_count[0]
+
+    chunk_queue = queue.Queue()
+    done_marker = None
+
+    def listAndMark(position, location):
+        try:
+            listLocation(location, lambda chunk: chunk_queue.put((position, chunk)),
+                         index, max_depth, pattern)
+        finally:
+            chunk_queue.put((position, done_marker))
+
+    pending_chunks = [[] for _ in locations]
+    done = [False for _ in locations]
+    current = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for position, l in enumerate(locations):
+            executor.submit(listAndMark, position, l)
+        while current < len(locations):
+            position, chunk = chunk_queue.get()
+            if chunk is done_marker:
+                done[position] = True
+            elif position == current:
+                printChunk(chunk)
+            else:
+                pending_chunks[position].append(chunk)
+            while current < len(locations) and done[current]:
+                current += 1
+                if current < len(locations):
+                    for pending_chunk in pending_chunks[current]:
+                        printChunk(pending_chunk)
+                    pending_chunks[current] = []
+
+    return file_count[0]
+
+
 def mainMethod(args):
     """
     @brief The "main" method.
@@ -103,20 +248,21 @@ def mainMethod(args):
 
     locations = Path.getLocations(file_type, exist_only=True, with_defaults=args.with_defaults)
 
+    index = None
+    if args.use_index:
+        index = Path.getPathIndex(file_type)
+
     if stem:
-        found_list = Path.getAllPathFromLocations(stem, locations)
+        found_list = Path.getAllPathFromLocations(stem, locations, index)
+        if file_type == "library" and args.with_defaults:
+            found_list = Path.removeDuplicates(found_list +
+                                               Path.getLibraryResolver().getAllPath(stem, locations=[]))
+        found_list = selfFilter(found_list, args.self)
+        for f in found_list:
+            print(f)
     else:
         logger.info("No stem provided. Listing all files")
-        found_list = []
-        for l in locations:
-            for root, _, files in os.walk(l):
-                for f in files:
-                    found_list.append(os.path.join(root, f))
-
-    found_list = selfFilter(found_list, args.self)
-
-    for f in found_list:
-        print(f)
+        streamLocations(Path.getUniqueLocations(locations), args.self, args.jobs, index,
+                        args.max_depth, args.glob)
 
     return exit_code
-
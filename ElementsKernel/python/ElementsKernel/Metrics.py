@@ -0,0 +1,325 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:file: ElementsKernel/Metrics.py
+
+:date: Oct 18, 2026
+
+Progress and throughput metrics of the programs. The mainMethod
+implementations create their metrics with the module functions:
+
+    from ElementsKernel import Metrics
+
+    items = Metrics.counter("items_processed", "Number of processed items")
+    latency = Metrics.timer("item_latency_seconds", "Processing time of an item")
+    for item in item_list:
+        with latency.time():
+            process(item)
+        items.inc()
+
+The Program class flushes them periodically to the file given by the
+--metrics-file generic option, in the OpenMetrics text format or as JSON
+lines.
+
+'''
+
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import ElementsKernel.Logging as log
+
+FORMATS = ["openmetrics", "jsonl"]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+_NAME_RE = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+
+
+class Counter(object):
+    """ Monotonically increasing value """
+
+    metric_type = "counter"
+
+    def __init__(self, name, help_text=""):
+        self.name = name
+        self.help_text = help_text
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """ Increment the counter. The amount cannot be negative """
+        if amount < 0:
+            raise Exception("The \"%s\" counter cannot be decremented" % self.name)
+        with self._lock:
+            self._value += amount
+
+    def getValue(self):
+        with self._lock:
+            return self._value
+
+    def getSamples(self):
+        """ Get the list of (suffix, labels, value) of the exposition """
+        return [("_total", "", self.getValue())]
+
+    def getJsonValue(self):
+        return self.getValue()
+
+
+class Gauge(object):
+    """ Value that can go up and down """
+
+    metric_type = "gauge"
+
+    def __init__(self, name, help_text=""):
+        self.name = name
+        self.help_text = help_text
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def getValue(self):
+        with self._lock:
+            return self._value
+
+    def getSamples(self):
+        return [("", "", self.getValue())]
+
+    def getJsonValue(self):
+        return self.getValue()
+
+
+class Timer(object):
+    """ Histogram of durations in seconds """
+
+    metric_type = "histogram"
+
+    def __init__(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self._buckets = sorted(buckets)
+        self._bucket_counts = [0] * len(self._buckets)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, duration):
+        """ Record a duration """
+        with self._lock:
+            self._count += 1
+            self._sum += duration
+            for i, bound in enumerate(self._buckets):
+                if duration <= bound:
+                    self._bucket_counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        """ Context manager recording the duration of its block """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def getCount(self):
+        with self._lock:
+            return self._count
+
+    def getSum(self):
+        with self._lock:
+            return self._sum
+
+    def getCumulativeBuckets(self):
+        """ Get the list of (upper bound, cumulative count) """
+        with self._lock:
+            cumulative = []
+            total = 0
+            for bound, count in zip(self._buckets, self._bucket_counts):
+                total += count
+                cumulative.append((bound, total))
+            return cumulative
+
+    def getSamples(self):
+        samples = [("_bucket", '{le="%s"}' % repr(float(bound)), count)
+                   for bound, count in self.getCumulativeBuckets()]
+        count = self.getCount()
+        samples.append(("_bucket", '{le="+Inf"}', count))
+        samples.append(("_count", "", count))
+        samples.append(("_sum", "", self.getSum()))
+        return samples
+
+    def getJsonValue(self):
+        return OrderedDict([("count", self.getCount()),
+                            ("sum", self.getSum()),
+                            ("buckets", OrderedDict((repr(float(b)), c)
+                                                    for b, c in self.getCumulativeBuckets()))])
+
+
+class MetricsRegistry(object):
+    """ Set of named metrics """
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _getOrCreate(self, metric_class, name, help_text, **kwargs):
+        if not _NAME_RE.match(name):
+            raise Exception("The \"%s\" metric name is not valid" % name)
+        with self._lock:
+            metric = self._metrics.get(name, None)
+            if metric is None:
+                metric = metric_class(name, help_text, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise Exception("The \"%s\" metric is already defined as a %s" % (name, metric.metric_type))
+            return metric
+
+    def counter(self, name, help_text=""):
+        """ Get or create a counter """
+        return self._getOrCreate(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        """ Get or create a gauge """
+        return self._getOrCreate(Gauge, name, help_text)
+
+    def timer(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        """ Get or create a timer """
+        return self._getOrCreate(Timer, name, help_text, buckets=buckets)
+
+    def getMetrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def formatOpenMetrics(self):
+        """ Get the exposition of the metrics in the OpenMetrics text format """
+        lines = []
+        for metric in self.getMetrics():
+            lines.append("# TYPE %s %s" % (metric.name, metric.metric_type))
+            if metric.help_text:
+                help_text = metric.help_text.replace("\\", "\\\\").replace("\n", "\\n")
+                lines.append("# HELP %s %s" % (metric.name, help_text))
+            for suffix, labels, value in metric.getSamples():
+                lines.append("%s%s%s %s" % (metric.name, suffix, labels, repr(value)))
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def formatJson(self, timestamp=None):
+        """ Get a JSON line with the timestamp and the values of the metrics """
+        if timestamp is None:
+            timestamp = time.time()
+        metrics = OrderedDict((m.name, m.getJsonValue()) for m in self.getMetrics())
+        return json.dumps(OrderedDict([("timestamp", timestamp), ("metrics", metrics)]))
+
+
+_registry = MetricsRegistry()
+
+
+def getRegistry():
+    """ Get the registry of the program metrics """
+    return _registry
+
+
+def counter(name, help_text=""):
+    """ Get or create a counter of the program registry """
+    return _registry.counter(name, help_text)
+
+
+def gauge(name, help_text=""):
+    """ Get or create a gauge of the program registry """
+    return _registry.gauge(name, help_text)
+
+
+def timer(name, help_text="", buckets=DEFAULT_BUCKETS):
+    """ Get or create a timer of the program registry """
+    return _registry.timer(name, help_text, buckets)
+
+
+class MetricsExporter(object):
+    """ Periodic writer of the metrics of a registry. With the openmetrics
+    format the file is replaced at each flush; with the jsonl format a line
+    is appended """
+
+    def __init__(self, output_file, interval=10.0, output_format="openmetrics", registry=None):
+        if output_format not in FORMATS:
+            raise Exception("The \"%s\" metrics format is not one of %s" % (output_format, FORMATS))
+        if not interval > 0:
+            raise Exception("The metrics flush interval must be positive: %s" % interval)
+        self._output_file = output_file
+        self._interval = interval
+        self._format = output_format
+        self._registry = registry if registry is not None else _registry
+        self._thread = None
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+
+    def flush(self):
+        """ Write the current values of the metrics """
+        with self._flush_lock:
+            if self._format == "jsonl":
+                with open(self._output_file, "a") as f:
+                    f.write(self._registry.formatJson() + "\n")
+            else:
+                tmp_file = "%s.%d.tmp" % (self._output_file, os.getpid())
+                with open(tmp_file, "w") as f:
+                    f.write(self._registry.formatOpenMetrics())
+                os.rename(tmp_file, self._output_file)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.flush()
+            except (IOError, OSError):
+                log.getLogger('ElementsMetrics').exception('The metrics cannot be written to "%s"',
+                                                           self._output_file)
+
+    def start(self):
+        """ Start the periodic flushes """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ElementsMetricsExporter")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """ Stop the periodic flushes and write the final values """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
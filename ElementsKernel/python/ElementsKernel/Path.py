@@ -27,9 +27,22 @@ from ElementsKernel.System import SHLIB_VAR_NAME, DEFAULT_INSTALL_PREFIX
 import os
 import sys
 import re
+import threading
+import time
+import fnmatch
+import struct
+import platform
 from distutils.sysconfig import get_python_lib
 from collections import OrderedDict
 
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue  # pylint: disable=import-error
+
+# time.perf_counter only exists since Python 3.3
+_clock = getattr(time, "perf_counter", time.time)
+
 Type = ["executable", "library", "python", "configuration", "auxiliary"]
 
 PATHSEP = os.pathsep
@@ -61,6 +74,10 @@ HAS_SUBLEVELS = { "executable": False,
                "configuration": True,
                    "auxiliary": True}
 
+MANIFEST_NAME = ".ElementsManifest"
+
+MANIFEST_HEADER = "# ElementsManifest 2"
+
 
 def getLocations(file_type="executable", exist_only=False, with_defaults=True):
     """
@@ -73,24 +90,142 @@ def getLocations(file_type="executable", exist_only=False, with_defaults=True):
         location_list += DEFAULT_INSTALL_LOCATIONS[file_type]
 
     if exist_only:
-        location_list = [p for p in location_list if os.path.exists(p)]
+        location_list = [p for p in location_list if _locationExists(p)]
+
+    return getUniqueLocations(location_list)
+
+
+def getUniqueLocations(locations, use_cache=True):
+    """
+    Remove the locations that are the same directory as a previous one.
+    The directories are identified by their (st_dev, st_ino) pair and
+    the non-existing locations by their normalized path. The first
+    spelling of each location is kept.
+    :param use_cache: keep the identity of the existing directories for
+    the next calls. It can be cleared with clearLocationCache.
+    """
+
+    unique_locations = []
+    location_ids = set()
+    for l in locations:
+        l_id = _getLocationId(l, use_cache)
+        if l_id not in location_ids:
+            location_ids.add(l_id)
+            unique_locations.append(l)
 
-    return location_list
+    return unique_locations
 
 
-def getPath(file_name, file_type="executable", raise_exception=True):
+def compactLocations(locations, prune=False):
+    """
+    Remove the duplicated locations, keeping the first occurrence of each
+    one and the order of the list.
+    :param prune: remove also the locations that do not exist. The empty
+    entries (the current directory) are kept.
+    :return: the compacted list and the number of removed entries
+    """
+    compacted = getUniqueLocations(locations)
+    if prune:
+        compacted = [l for l in compacted if not l or os.path.exists(l)]
+    return compacted, len(locations) - len(compacted)
+
+
+def clearLocationCache():
+    """ Forget the cached identities of the locations """
+    with _location_lock:
+        _location_ids.clear()
+
+
+def _getLocationId(location, use_cache=True):
+    """ Get the (st_dev, st_ino) pair of an existing location or
+    its normalized path. The cache is keyed on the absolute path: the
+    relative locations depend on the current directory """
+    if use_cache:
+        try:
+            cache_key = os.path.abspath(location)
+        except OSError:
+            # the current directory has been removed
+            return _getLocationId(location, use_cache=False)
+        with _location_lock:
+            if cache_key in _location_ids:
+                return _location_ids[cache_key]
+    _countStatCalls()
+    try:
+        st = os.stat(location)
+        location_id = (st.st_dev, st.st_ino)
+    except OSError:
+        location_id = os.path.normpath(location)
+    if use_cache:
+        with _location_lock:
+            _location_ids[cache_key] = location_id
+    return location_id
+
+
+_location_ids = {}
+
+_location_lock = threading.Lock()
+
+
+def getPath(file_name, file_type="executable", raise_exception=True, use_index=None):
     """
     Get full path to the file name searched in the file-type path
+    :param use_index: use the shared PathIndex of the file type. If None,
+    the module setting from enableIndex is used.
     """
 
-    location_list = getLocations(file_type)
+    lookup = PathLookup(file_name, file_type, use_index)
 
-    result = getPathFromLocations(file_name, location_list)
+    if not lookup.isCached():
+        resolver = lookup.getResolver()
+        if resolver is not None:
+            lookup.setResult(resolver(file_name))
+        else:
+            lookup.setResult(getPathFromLocations(file_name, getLocations(file_type)))
 
-    if not result and raise_exception:
-        raise Exception("The %s file \"%s\" cannot be found!" % (file_type, file_name))
+    return lookup.getResult(raise_exception)
 
-    return result
+
+class PathLookup(object):
+    """ A single getPath lookup: the query of the lookup cache, the storage
+    of the result and the accounting. It is shared by getPath and the
+    ElementsKernel.AsyncPath coroutines, which only differ in the way the
+    locations are probed.
+    """
+
+    def __init__(self, file_name, file_type="executable", use_index=None):
+        self._start_time = _clock()
+        self._file_name = file_name
+        self._file_type = file_type
+        self._use_index = _use_index if use_index is None else use_index
+        self._key = (file_type, file_name, os.environ.get(VARIABLE[file_type], None))
+        self._cached = _getCachedLookup(self._key)
+        self._result = self._cached[0] if self._cached is not None else None
+
+    def isCached(self):
+        """ Check if the result comes from the lookup cache """
+        return self._cached is not None
+
+    def getResolver(self):
+        """ Get the callable resolving the file name with the shared PathIndex
+        or the LibraryResolver, if they have to be used. None is returned if
+        the file name has to be looked for in the locations of the file type """
+        if self._use_index:
+            return getPathIndex(self._file_type).getPath
+        if self._file_type == "library":
+            return getLibraryResolver().getPath
+        return None
+
+    def setResult(self, result):
+        """ Set the result of the lookup and keep it in the lookup cache """
+        self._result = result
+        _storeLookup(self._key, result)
+
+    def getResult(self, raise_exception=True):
+        """ Account for the lookup and get its result """
+        _countLookup(self._result is not None, self.isCached(), _clock() - self._start_time)
+        if not self._result and raise_exception:
+            raise Exception("The %s file \"%s\" cannot be found!" % (self._file_type, self._file_name))
+        return self._result
 
 
 def getLocationsFromEnv(path_variable, exist_only=False):
@@ -106,7 +241,7 @@ def getLocationsFromEnv(path_variable, exist_only=False):
         found_list = env_content.split(PATHSEP)
 
     if exist_only:
-        found_list = [p for p in found_list if os.path.exists(p)]
+        found_list = [p for p in found_list if _locationExists(p)]
 
     return found_list
 
@@ -118,29 +253,99 @@ def getPathFromLocations(file_name, locations):
     """
 
     for l in locations:
-        file_path = os.path.join(l, file_name)
-        if os.path.exists(file_path):
-            return file_path
+        if pathExists(l, file_name):
+            return os.path.join(l, file_name)
 
     return None
 
 
-def getAllPathFromLocations(file_name, locations):
+def getAllPathFromLocations(file_name, locations, index=None):
     """
     Get all the paths to the searched  file name from the
     provided locations.
+    :param index: optional PathIndex whose cached directory listings
+    are used instead of probing each location.
     """
 
+    if index is not None:
+        return index.getAllPathFromLocations(file_name, locations)
+
     file_list = []
 
     for l in locations:
-        file_path = os.path.join(l, file_name)
-        if os.path.exists(file_path):
-            file_list.append(file_path)
+        if pathExists(l, file_name):
+            file_list.append(os.path.join(l, file_name))
 
     return removeDuplicates(file_list)
 
 
+def getPaths(file_names, file_type="executable", raise_exception=True, use_index=None):
+    """
+    Get the full paths to several file names searched in the file-type path.
+    Each location is listed only once for the whole set of names and the
+    first found wins for each name.
+    :param file_names: list of file names to look for
+    :param raise_exception: raise an exception listing the names that
+    cannot be found. Otherwise they are mapped to None.
+    :param use_index: use the shared PathIndex of the file type. If None,
+    the module setting from enableIndex is used.
+    :return: an ordered dictionary of file name to full path.
+    """
+
+    if use_index is None:
+        use_index = _use_index
+
+    if use_index:
+        index = getPathIndex(file_type)
+        result = OrderedDict((n, index.getPath(n)) for n in file_names)
+    else:
+        location_list = getLocations(file_type)
+        result = OrderedDict((n, p[0] if p else None)
+                             for n, p in _getBatchPathFromLocations(file_names, location_list,
+                                                                    first_only=True).items())
+
+    not_found = [n for n in result if result[n] is None]
+    if not_found and raise_exception:
+        raise Exception("The %s files \"%s\" cannot be found!" % (file_type, "\", \"".join(not_found)))
+
+    return result
+
+
+def getAllPathsFromLocations(file_names, locations):
+    """
+    Get all the paths to several file names from the provided
+    locations. Each location is listed only once for the whole set
+    of names.
+    :return: an ordered dictionary of file name to the list of paths.
+    The names that cannot be found are mapped to an empty list.
+    """
+
+    return OrderedDict((n, removeDuplicates(p))
+                       for n, p in _getBatchPathFromLocations(file_names, locations).items())
+
+
+def _getBatchPathFromLocations(file_names, locations, first_only=False):
+    """ Look for all the file names in one pass over the locations. The
+    directory listings are only kept for the duration of the call """
+    listings = {}
+
+    def listDir(dir_path):
+        if dir_path not in listings:
+            listings[dir_path] = _scanDir(dir_path)
+        return listings[dir_path]
+
+    name_parts = dict((n, _splitFileName(n)) for n in file_names)
+    result = OrderedDict((n, []) for n in file_names)
+    for l in locations:
+        for n in name_parts:
+            if first_only and result[n]:
+                continue
+            if _listingPathExists(listDir, l, n, name_parts[n]):
+                result[n].append(os.path.join(l, n))
+
+    return result
+
+
 def getPathFromEnvVariable(file_name, path_variable):
     """
     Look for the first path valid in the <path_variable> environment
@@ -159,6 +364,142 @@ def getPathFromEnvVariable(file_name, path_variable):
     return getPathFromLocations(file_name, location_list)
 
 
+def pathSearch(searched_name, root, max_depth=None, workers=1):
+    """
+    Search recursively for a file or a directory below the root directory.
+    It is the equivalent of the C++ Elements::pathSearch. The symbolic links
+    to directories are not followed.
+    :param searched_name: name of the entry or glob pattern that it has
+    to match
+    :param root: the directory where the search starts
+    :param max_depth: maximum number of sub-directory levels to search.
+    0 means the root directory only and None means no limit.
+    :param workers: number of threads used to list the sub-directories.
+    With more than one worker, the order of the results is not defined.
+    The search is always serial with Python 2.
+    :return: a generator of the matching paths. The search stops as soon
+    as the generator is closed.
+    """
+
+    if any(c in searched_name for c in "*?["):
+        match = re.compile(fnmatch.translate(searched_name)).match
+    else:
+        match = searched_name.__eq__
+
+    if workers > 1:
+        try:
+            import concurrent.futures  # pylint: disable=unused-import
+        except ImportError:
+            # Python 2
+            workers = 1
+
+    if workers <= 1:
+        return _pathSearchSerial(match, root, max_depth)
+
+    return _pathSearchParallel(match, root, max_depth, workers)
+
+
+def pathSearchInEnvVariable(searched_name, path_variable, max_depth=None, workers=1):
+    """
+    Search recursively for a file or a directory below each of the
+    locations of the <path_variable> environment variable. It is the
+    equivalent of the C++ Elements::pathSearchInEnvVariable.
+    :return: a generator of the matching paths.
+    """
+
+    for l in getLocationsFromEnv(path_variable, exist_only=True):
+        for p in pathSearch(searched_name, l, max_depth, workers):
+            yield p
+
+
+def _pathSearchSerial(match, root, max_depth):
+    """ Depth first search in the calling thread """
+    dir_list = [(root, 0)]
+    while dir_list:
+        dir_path, depth = dir_list.pop()
+        sub_dirs = []
+        try:
+            entries = _listDirEntries(dir_path)
+        except OSError:
+            continue
+        for name, entry_path, is_dir in entries:
+            if match(name):
+                yield entry_path
+            if (max_depth is None or depth < max_depth) and is_dir:
+                sub_dirs.append((entry_path, depth + 1))
+        dir_list.extend(reversed(sub_dirs))
+
+
+def _listDirEntries(dir_path):
+    """ Get the (name, path, is_dir) tuples of the entries of a directory.
+    The symbolic links to directories are not counted as directories """
+    if not hasattr(os, "scandir"):
+        # Python 2
+        entries = []
+        for name in os.listdir(dir_path):
+            entry_path = os.path.join(dir_path, name)
+            entries.append((name, entry_path, os.path.isdir(entry_path) and not os.path.islink(entry_path)))
+        return entries
+    return [(entry.name, entry.path, entry.is_dir(follow_symlinks=False)) for entry in os.scandir(dir_path)]
+
+
+def _pathSearchParallel(match, root, max_depth, workers):
+    """ Search where each directory is listed in a thread pool task. The
+    sub-directories are submitted as new tasks and the matches are passed
+    back through a queue. """
+    result_queue = queue.Queue()
+    stop = threading.Event()
+    lock = threading.Lock()
+    pending = [0]
+    done_marker = None
+
+    # not at the top: the module is also imported with Python 2
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        def submit(dir_path, depth):
+            with lock:
+                pending[0] += 1
+            try:
+                executor.submit(visit, dir_path, depth)
+            except RuntimeError:
+                finish()
+
+        def finish():
+            with lock:
+                pending[0] -= 1
+                if not pending[0]:
+                    result_queue.put(done_marker)
+
+        def visit(dir_path, depth):
+            try:
+                found = []
+                if stop.is_set():
+                    return
+                for name, entry_path, is_dir in _listDirEntries(dir_path):
+                    if match(name):
+                        found.append(entry_path)
+                    if (max_depth is None or depth < max_depth) and is_dir and not stop.is_set():
+                        submit(entry_path, depth + 1)
+                if found:
+                    result_queue.put(found)
+            except OSError:
+                pass
+            finally:
+                finish()
+
+        submit(root, 0)
+        try:
+            while True:
+                found = result_queue.get()
+                if found is done_marker:
+                    break
+                for p in found:
+                    yield p
+        finally:
+            stop.set()
+
+
 def joinPath(path_list):
     """ stupid wrapper to look like the C++ call """
     return os.pathsep.join(path_list)
@@ -183,28 +524,61 @@ def multiPathAppend(initial_locations, suffixes):
 
 
 def which(program):
-    """ Command to assert the existance of an executable
+    """ Command to assert the existance of an executable. The lookups in
+        the PATH directories are cached (see getWhichIndex).
         :param program: program path, absolute or relative
     """
 
-    def is_exe(fpath):
-        """ small function to check if the item is an executable """
-        return os.path.isfile(fpath) and os.access(fpath, os.X_OK)
-
     fpath, _ = os.path.split(program)
     if fpath:
-        if is_exe(program):
+        if _isExecutable(program):
             return program
     else:
-        for path in os.environ["PATH"].split(os.pathsep):
-            path = path.strip('"')
-            exe_file = os.path.join(path, program)
-            if is_exe(exe_file):
-                return exe_file
+        return getWhichIndex().getExecutable(program)
 
     return None
 
 
+def whichAll(programs):
+    """ Batch version of which. All the programs are resolved against the
+        same listings of the PATH directories.
+        :param programs: list of program paths, absolute or relative
+        :return: an ordered dictionary of program to executable path (or None)
+    """
+
+    return OrderedDict((p, which(p)) for p in programs)
+
+
+def getWhichIndex():
+    """ Get the PathIndex of the directories of the current PATH
+        environment variable. One index is kept per PATH value.
+    """
+
+    path_string = os.environ["PATH"]
+    with _which_lock:
+        index = _which_indexes.get(path_string, None)
+        if index is None:
+            if len(_which_indexes) >= _WHICH_INDEX_MAX:
+                _which_indexes.clear()
+            locations = [p.strip('"') or os.curdir for p in path_string.split(os.pathsep)]
+            index = PathIndex("executable", check_interval=1.0, locations=locations)
+            _which_indexes[path_string] = index
+    return index
+
+
+def _isExecutable(fpath):
+    """ small function to check if the item is an executable """
+    _countStatCalls()
+    return os.path.isfile(fpath) and os.access(fpath, os.X_OK)
+
+
+_which_indexes = {}
+
+_WHICH_INDEX_MAX = 8
+
+_which_lock = threading.Lock()
+
+
 def pyVersionWhich(program, program3_prefix=None):
     """ Version of which that returns the right executable
         depending on the calling python version.
@@ -250,3 +624,701 @@ def getTargetPath(file_name, target_dir, target_name=None, use_stem=False):
 def removeDuplicates(file_list):
     """ stupid wrapper to look like the C++ call """
     return list(OrderedDict.fromkeys(file_list))
+
+
+class PathIndex(object):
+    """ Cached index of the locations of a file type.
+
+    Each location is listed once with os.scandir and the sub-directories
+    are listed only when a lookup needs them (for the file types that have
+    sub-levels). The first match of each looked up name is kept in a map.
+    Everything is dropped when the environment variable of the file type
+    changes or when the modification time of a listed directory changes.
+    The latter is checked at most every check_interval seconds. If a fixed
+    list of locations is given, the environment variable is not used.
+    """
+
+    def __init__(self, file_type="executable", with_defaults=True, check_interval=1.0,
+                 locations=None):
+        self._file_type = file_type
+        self._with_defaults = with_defaults
+        self._check_interval = check_interval
+        self._fixed_locations = locations
+        self._lock = threading.RLock()
+        self._env_value = None
+        self._locations = []
+        self._listings = {}
+        self._first_match = {}
+        self._executables = {}
+        self._last_check = 0.0
+        self.refresh()
+
+    def refresh(self):
+        """ Drop all the cached listings and read the locations again """
+        with self._lock:
+            if self._fixed_locations is None:
+                self._env_value = os.environ.get(VARIABLE[self._file_type], None)
+                self._locations = getLocations(self._file_type, with_defaults=self._with_defaults)
+            else:
+                self._locations = list(self._fixed_locations)
+            self._listings = {}
+            self._first_match = {}
+            self._executables = {}
+            self._last_check = time.time()
+
+    def getFileType(self):
+        """ Get the file type of the index """
+        return self._file_type
+
+    def getLocations(self):
+        """ Get the indexed locations """
+        self._checkFreshness()
+        return list(self._locations)
+
+    def _checkFreshness(self):
+        """ Refresh the index if the environment variable or a listed
+        directory has changed """
+        with self._lock:
+            if self._fixed_locations is None and \
+                    os.environ.get(VARIABLE[self._file_type], None) != self._env_value:
+                self.refresh()
+                return
+            now = time.time()
+            if now - self._last_check < self._check_interval:
+                return
+            self._last_check = now
+            for dir_path, (mtime, _) in list(self._listings.items()):
+                if _getMTime(dir_path) != mtime:
+                    self._listings = {}
+                    self._first_match = {}
+                    self._executables = {}
+                    break
+
+    def _listDir(self, dir_path):
+        """ Get the cached listing of a directory. It maps each entry name to a
+        (is_dir, is_link) tuple. None is returned if the directory cannot be read.
+        """
+        listing = self._listings.get(dir_path, None)
+        if listing is None:
+            listing = (_getMTime(dir_path), _scanDir(dir_path))
+            self._listings[dir_path] = listing
+        return listing[1]
+
+    def _iterPathFromLocations(self, file_name, locations):
+        """ Generate all the paths to the file name in the locations """
+        name_parts = _splitFileName(file_name, HAS_SUBLEVELS[self._file_type])
+        for l in locations:
+            if _listingPathExists(self._listDir, l, file_name, name_parts):
+                yield os.path.join(l, file_name)
+
+    def getPath(self, file_name):
+        """ Get the first path to the file name in the indexed locations.
+        None is returned if it is not found """
+        self._checkFreshness()
+        with self._lock:
+            if file_name not in self._first_match:
+                self._first_match[file_name] = next(self._iterPathFromLocations(file_name, self._locations),
+                                                    None)
+            return self._first_match[file_name]
+
+    def getExecutable(self, program):
+        """ Get the first path to the program in the indexed locations that
+        is an executable file. None is returned if it is not found """
+        self._checkFreshness()
+        with self._lock:
+            if program not in self._executables:
+                self._executables[program] = next((p for p in self._iterPathFromLocations(program,
+                                                                                         self._locations)
+                                                   if _isExecutable(p)), None)
+            return self._executables[program]
+
+    def getAllPath(self, file_name):
+        """ Get all the paths to the file name in the indexed locations """
+        return self.getAllPathFromLocations(file_name, self._locations)
+
+    def getPathFromLocations(self, file_name, locations):
+        """ Get the first path to the file name in the provided locations
+        using the cached listings """
+        self._checkFreshness()
+        with self._lock:
+            return next(self._iterPathFromLocations(file_name, locations), None)
+
+    def getAllPathFromLocations(self, file_name, locations):
+        """ Get all the paths to the file name in the provided locations
+        using the cached listings """
+        self._checkFreshness()
+        with self._lock:
+            return removeDuplicates(self._iterPathFromLocations(file_name, locations))
+
+    def listFiles(self, location):
+        """ Get all the files below the location. Like os.walk, the
+        symbolic links to directories are not followed """
+        manifest = getManifest(location)
+        if manifest is not None:
+            file_list = manifest.listFiles()
+            if file_list is not None:
+                return file_list
+        self._checkFreshness()
+        file_list = []
+        with self._lock:
+            dir_list = [location]
+            while dir_list:
+                dir_path = dir_list.pop(0)
+                entries = self._listDir(dir_path)
+                if not entries:
+                    continue
+                for name in sorted(entries):
+                    is_dir, is_link = entries[name]
+                    if not is_dir:
+                        file_list.append(os.path.join(dir_path, name))
+                    elif not is_link:
+                        dir_list.append(os.path.join(dir_path, name))
+        return file_list
+
+
+def _splitFileName(file_name, with_sublevels=True):
+    """ Split the file name into its components. None is returned if
+    the name cannot be answered from directory listings """
+    if not file_name or os.path.isabs(file_name):
+        return None
+    name = os.path.normpath(file_name)
+    if name == os.curdir or name == os.pardir or name.startswith(os.pardir + os.sep):
+        return None
+    parts = name.split(os.sep)
+    if len(parts) > 1 and not with_sublevels:
+        return None
+    return parts
+
+
+def _listingPathExists(list_dir, location, file_name, name_parts):
+    """ Check the existence of the file name in the location. The manifest
+    of the location is used if any, then the directory listings returned by
+    the list_dir callable. The filesystem is probed directly if the name
+    parts are None.
+    """
+    manifest = getManifest(location)
+    if manifest is not None:
+        found = manifest.exists(file_name)
+        if found is not None:
+            return found
+    if name_parts is None:
+        _countStatCalls()
+        return os.path.exists(os.path.join(location, file_name))
+    dir_path = location
+    for part in name_parts[:-1]:
+        entries = list_dir(dir_path)
+        if not entries or not entries.get(part, (False, False))[0]:
+            return False
+        dir_path = os.path.join(dir_path, part)
+    entries = list_dir(dir_path)
+    return bool(entries) and name_parts[-1] in entries
+
+
+def _getMTime(dir_path):
+    """ Get the modification time of a directory or None """
+    _countStatCalls()
+    try:
+        return os.stat(dir_path).st_mtime
+    except OSError:
+        return None
+
+
+def _scanDir(dir_path):
+    """ List a directory with os.scandir. Each entry name is mapped to
+    a (is_dir, is_link) tuple. The broken links are skipped. None is
+    returned if the directory cannot be read.
+    """
+    entries = {}
+    _countStatCalls()
+    try:
+        if not hasattr(os, "scandir"):
+            return _listDir(dir_path)
+        for entry in os.scandir(dir_path):
+            is_link = entry.is_symlink()
+            if is_link:
+                try:
+                    entry.stat()
+                except OSError:
+                    continue
+            entries[entry.name] = (entry.is_dir(), is_link)
+    except OSError:
+        return None
+    return entries
+
+
+def _listDir(dir_path):
+    """ Same as _scanDir with os.listdir, for Python 2 """
+    entries = {}
+    for name in os.listdir(dir_path):
+        entry_path = os.path.join(dir_path, name)
+        is_link = os.path.islink(entry_path)
+        if is_link and not os.path.exists(entry_path):
+            continue
+        entries[name] = (os.path.isdir(entry_path), is_link)
+    return entries
+
+
+_path_indexes = {}
+
+_use_index = False
+
+_index_lock = threading.Lock()
+
+
+def enableIndex(enabled=True):
+    """ Switch on (or off) the use of the shared PathIndex instances
+    by getPath. It is off by default.
+    """
+    global _use_index  # pylint: disable=global-statement
+    _use_index = enabled
+
+
+def getPathIndex(file_type="executable"):
+    """ Get the shared PathIndex of a file type. It is created on
+    first use """
+    with _index_lock:
+        if file_type not in _path_indexes:
+            _path_indexes[file_type] = PathIndex(file_type)
+        return _path_indexes[file_type]
+
+
+class FileManifest(object):
+    """ Precomputed list of the files below an installed location.
+
+    The manifest is written at installation time at the top of the
+    location in the MANIFEST_NAME file. It contains a header line and then
+    one tab separated line per directory ("d", relative path, mtime), per
+    symbolic link to a directory ("l", relative path) and per file ("f",
+    relative path, size, mtime). The directory times are compared with the
+    current ones: the manifest cannot answer for a directory that has
+    changed since its creation and the filesystem has to be probed instead.
+    """
+
+    def __init__(self, location, entries, dir_times, links):
+        self._location = location
+        self._entries = entries
+        self._dir_times = dir_times
+        self._links = links
+        self._fresh = {}
+
+    @staticmethod
+    def read(location):
+        """ Read the manifest of a location. None is returned if there is
+        no (valid) manifest """
+        entries = {}
+        dir_times = {}
+        links = set()
+        _countStatCalls()
+        try:
+            with open(os.path.join(location, MANIFEST_NAME)) as f:
+                if f.readline().rstrip("\n") != MANIFEST_HEADER:
+                    return None
+                for line in f:
+                    fields = line.rstrip("\n").split("\t")
+                    if fields[0] == "f":
+                        entries[fields[1]] = (int(fields[2]), float(fields[3]))
+                    elif fields[0] == "d":
+                        dir_times[fields[1]] = float(fields[2])
+                    elif fields[0] == "l":
+                        links.add(fields[1])
+                    else:
+                        return None
+        except (OSError, IOError, ValueError, IndexError):
+            return None
+        if os.curdir not in dir_times:
+            return None
+        return FileManifest(location, entries, dir_times, links)
+
+    def getLocation(self):
+        """ Get the location described by the manifest """
+        return self._location
+
+    def getEntry(self, file_name):
+        """ Get the (size, mtime) of the file or None if it is not listed """
+        return self._entries.get(os.path.normpath(file_name), None)
+
+    def isFresh(self, rel_dir=os.curdir):
+        """ Check that a listed directory has not changed since the creation
+        of the manifest """
+        if rel_dir not in self._fresh:
+            mtime = _getMTime(os.path.join(self._location, rel_dir))
+            self._fresh[rel_dir] = mtime is not None and mtime == self._dir_times[rel_dir]
+        return self._fresh[rel_dir]
+
+    def exists(self, file_name):
+        """ Check if the file name is a listed file or directory. None is
+        returned if the manifest cannot answer: the name is below a symbolic
+        link to a directory or one of the directories on the way has changed.
+        """
+        if os.path.isabs(file_name):
+            _countStatCalls()
+            return os.path.exists(file_name)
+        name = os.path.normpath(file_name)
+        if name == os.pardir or name.startswith(os.pardir + os.sep):
+            return None
+        rel_dir = os.curdir
+        for part in name.split(os.sep)[:-1]:
+            if rel_dir not in self._dir_times:
+                break
+            if not self.isFresh(rel_dir):
+                return None
+            rel_dir = os.path.normpath(os.path.join(rel_dir, part))
+            if rel_dir in self._links:
+                return None
+        if rel_dir in self._dir_times and not self.isFresh(rel_dir):
+            return None
+        return name in self._entries or name in self._dir_times or name in self._links
+
+    def listFiles(self):
+        """ Get the full paths of all the listed files. None is returned if
+        one of the directories has changed """
+        if not all(self.isFresh(d) for d in self._dir_times):
+            return None
+        return [os.path.join(self._location, rel_path) for rel_path in sorted(self._entries)]
+
+
+_manifests = {}
+
+_use_manifest = bool(os.environ.get("ELEMENTS_PATH_MANIFEST", ""))
+
+_manifest_lock = threading.Lock()
+
+
+def enableManifest(enabled=True):
+    """ Switch on (or off) the use of the installed file manifests
+    for the lookups. It is off by default unless the ELEMENTS_PATH_MANIFEST
+    environment variable is set.
+    """
+    global _use_manifest  # pylint: disable=global-statement
+    _use_manifest = enabled
+
+
+def clearManifestCache():
+    """ Forget the manifests read so far """
+    with _manifest_lock:
+        _manifests.clear()
+
+
+def getManifest(location):
+    """ Get the FileManifest of a location. Each location manifest
+    is read only once per process. None is returned if there is no
+    manifest or if their use is switched off.
+    """
+    if not _use_manifest:
+        return None
+    with _manifest_lock:
+        if location not in _manifests:
+            _manifests[location] = FileManifest.read(location)
+        return _manifests[location]
+
+
+def _locationExists(location):
+    """ Check the existence of a location, using its manifest if any """
+    if getManifest(location) is not None:
+        return True
+    _countStatCalls()
+    return os.path.exists(location)
+
+
+def pathExists(location, file_name):
+    """ Check the existence of the file name in the location, using
+    its manifest if any """
+    manifest = getManifest(location)
+    if manifest is not None:
+        found = manifest.exists(file_name)
+        if found is not None:
+            return found
+    _countStatCalls()
+    return os.path.exists(os.path.join(location, file_name))
+
+
+_lookup_cache = {}
+
+_lookup_cache_ttl = float(os.environ.get("ELEMENTS_PATH_CACHE_TTL", 0.0))
+
+_lookup_stats = {"lookups": 0, "hits": 0, "misses": 0, "cache_hits": 0,
+                 "stat_calls": 0, "lookup_time": 0.0}
+
+_lookup_lock = threading.Lock()
+
+
+def setLookupCacheTTL(ttl):
+    """ Set the time to live (in seconds) of the entries of the getPath cache.
+    Only the misses and the matches found in the default install locations
+    are cached. A null value (the default unless the ELEMENTS_PATH_CACHE_TTL
+    environment variable is set) switches the cache off.
+    """
+    global _lookup_cache_ttl  # pylint: disable=global-statement
+    with _lookup_lock:
+        _lookup_cache_ttl = float(ttl)
+        _lookup_cache.clear()
+
+
+def invalidateLookupCache(file_type=None):
+    """ Remove the cached getPath results, either all of them or only the ones
+    of a file type. The content of the dynamic linker cache is read again
+    for the libraries. """
+    with _lookup_lock:
+        if file_type is None:
+            _lookup_cache.clear()
+        else:
+            for key in [k for k in _lookup_cache if k[0] == file_type]:
+                del _lookup_cache[key]
+    if file_type in (None, "library") and _library_resolver is not None:
+        _library_resolver.clear()
+
+
+def getLookupStats():
+    """ Get the accounting of the getPath lookups of the process. It is a
+    dictionary with the number of lookups, hits, misses, cache hits, filesystem
+    calls (stat, scandir, open) and the cumulative lookup time in seconds.
+    """
+    with _lookup_lock:
+        return dict(_lookup_stats)
+
+
+def resetLookupStats():
+    """ Set all the lookup accounting counters back to zero """
+    with _lookup_lock:
+        for key in _lookup_stats:
+            _lookup_stats[key] = 0
+        _lookup_stats["lookup_time"] = 0.0
+
+
+def _getCachedLookup(key):
+    """ Get the (result,) tuple of a cached lookup or None """
+    with _lookup_lock:
+        if key in _lookup_cache:
+            expiry, result = _lookup_cache[key]
+            if time.time() < expiry:
+                return (result,)
+            del _lookup_cache[key]
+    return None
+
+
+def _setCachedLookup(key, result):
+    """ Cache a lookup result if the cache is switched on """
+    with _lookup_lock:
+        if _lookup_cache_ttl > 0:
+            _lookup_cache[key] = (time.time() + _lookup_cache_ttl, result)
+
+
+def _storeLookup(key, result):
+    """ Cache a lookup result if it is a miss or a match in the default
+    locations. They are the lookups that probe all the locations. """
+    file_type, file_name, _ = key
+    if result is None or not [l for l in getLocationsFromEnv(VARIABLE[file_type])
+                              if os.path.join(l, file_name) == result]:
+        _setCachedLookup(key, result)
+
+
+def _countLookup(found, from_cache, duration):
+    """ Account for a getPath lookup """
+    with _lookup_lock:
+        _lookup_stats["lookups"] += 1
+        _lookup_stats["hits" if found else "misses"] += 1
+        if from_cache:
+            _lookup_stats["cache_hits"] += 1
+        _lookup_stats["lookup_time"] += duration
+
+
+def _countStatCalls(number=1):
+    """ Account for the filesystem metadata calls """
+    with _lookup_lock:
+        _lookup_stats["stat_calls"] += number
+
+
+LD_SO_CACHE = "/etc/ld.so.cache"
+
+_LD_SO_CACHE_MAGIC = b"glibc-ld.so.cache1.1"
+
+_LD_SO_CACHE_HEADER = "=20sII4xI12x"
+
+_LD_SO_CACHE_ENTRY = "=iIIIQ"
+
+# FLAG_ELF_LIBC6 of the glibc ldconfig.h
+_LD_SO_CACHE_ELF_LIBC6 = 0x0003
+
+# the FLAG_*_LIB64 architecture bits of the glibc ldconfig.h for
+# the 64-bit platforms
+_LD_SO_CACHE_ARCH_FLAGS = {"x86_64": 0x0300,
+                           "s390x": 0x0400,
+                           "ppc64": 0x0500,
+                           "ppc64le": 0x0500,
+                           "aarch64": 0x0a00}
+
+_LD_SO_CACHE_32BIT_MACHINES = ["x86_64", "i386", "i486", "i586", "i686"]
+
+
+def getLinkerCacheFlags():
+    """ Get the flags of the dynamic linker cache entries that can be loaded
+    by the running interpreter. None is returned for an unknown platform """
+    machine = platform.machine()
+    if struct.calcsize("P") == 4:
+        if machine in _LD_SO_CACHE_32BIT_MACHINES:
+            return _LD_SO_CACHE_ELF_LIBC6
+        return None
+    if machine in _LD_SO_CACHE_ARCH_FLAGS:
+        return _LD_SO_CACHE_ELF_LIBC6 | _LD_SO_CACHE_ARCH_FLAGS[machine]
+    return None
+
+
+def readLinkerCache(cache_file=LD_SO_CACHE, flags=None):
+    """ Read the libraries registered in the dynamic linker cache. Only
+    the "glibc-ld.so.cache1.1" format (with or without the old format
+    in front of it) is supported.
+    :param flags: only keep the entries with these flags. By default
+    the ones of the running interpreter (see getLinkerCacheFlags), so
+    that the libraries of the other architectures of a multilib system
+    are skipped. -1 keeps all the entries.
+    :return: an ordered dictionary of the library names to the list of
+    their paths. It is empty if the cache cannot be read.
+    """
+    if flags is None:
+        flags = getLinkerCacheFlags()
+        if flags is None:
+            flags = -1
+    libraries = OrderedDict()
+    _countStatCalls()
+    try:
+        with open(cache_file, "rb") as f:
+            data = f.read()
+    except (OSError, IOError):
+        return libraries
+
+    base = data.find(_LD_SO_CACHE_MAGIC)
+    if base < 0:
+        return libraries
+
+    def getString(offset):
+        end = data.find(b"\0", base + offset)
+        return data[base + offset:end].decode("utf-8", "replace")
+
+    try:
+        _, lib_number, _, _ = struct.unpack_from(_LD_SO_CACHE_HEADER, data, base)
+        entry_offset = base + struct.calcsize(_LD_SO_CACHE_HEADER)
+        entry_size = struct.calcsize(_LD_SO_CACHE_ENTRY)
+        for i in range(lib_number):
+            entry_flags, key, value, _, _ = struct.unpack_from(_LD_SO_CACHE_ENTRY, data,
+                                                               entry_offset + i * entry_size)
+            if flags == -1 or entry_flags == flags:
+                libraries.setdefault(getString(key), []).append(getString(value))
+    except struct.error:
+        pass
+
+    return libraries
+
+
+def _versionKey(file_name):
+    """ Sorting key of library file names: the highest version first,
+    then the shortest name """
+    version = tuple(int(v) for v in re.findall(r"\d+", file_name.split(".so", 1)[-1]))
+    return (tuple(-v for v in version) + (0,), len(file_name))
+
+
+class LibraryResolver(object):
+    """ Resolver of the library locations.
+
+    The libraries are looked up in the library path environment variable
+    locations, then in the dynamic linker cache (read only once) and then
+    in the default install locations. The results are kept in the getPath
+    lookup cache, with the same time to live (see setLookupCacheTTL) and
+    invalidation (see invalidateLookupCache).
+    """
+
+    def __init__(self, cache_file=LD_SO_CACHE):
+        self._cache_file = cache_file
+        self._linker_cache = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """ Forget the linker cache content """
+        with self._lock:
+            self._linker_cache = None
+
+    def getLinkerCache(self):
+        """ Get the content of the dynamic linker cache """
+        with self._lock:
+            if self._linker_cache is None:
+                self._linker_cache = readLinkerCache(self._cache_file)
+            return self._linker_cache
+
+    def getPath(self, file_name):
+        """ Get the full path to a library file name. None is returned
+        if it cannot be found """
+        key = ("library", file_name, os.environ.get(VARIABLE["library"], None))
+        cached = _getCachedLookup(key)
+        if cached is not None:
+            return cached[0]
+
+        result = getPathFromLocations(file_name, getLocationsFromEnv(VARIABLE["library"]))
+        if result is None and os.sep not in file_name:
+            result = next(iter(self.getLinkerCache().get(file_name, [])), None)
+        if result is None:
+            result = getPathFromLocations(file_name, DEFAULT_INSTALL_LOCATIONS["library"])
+
+        _storeLookup(key, result)
+        return result
+
+    def getAllPath(self, pattern, locations=None, with_linker_cache=True):
+        """ Get all the paths to the libraries whose file name matches the
+        glob pattern (like "libElementsKernel.so*"), in the search order. For
+        each location the best match comes first.
+        :param locations: the locations to look into. By default the
+        library path environment variable locations.
+        :param with_linker_cache: add the matches from the linker cache
+        """
+        if locations is None:
+            locations = getLocationsFromEnv(VARIABLE["library"])
+
+        found_list = []
+        for l in locations:
+            entries = _scanDir(l)
+            if entries:
+                names = fnmatch.filter(entries, pattern)
+                found_list += [os.path.join(l, n) for n in sorted(names, key=_versionKey)]
+
+        if with_linker_cache:
+            linker_cache = self.getLinkerCache()
+            for n in sorted(fnmatch.filter(linker_cache, pattern), key=_versionKey):
+                found_list += linker_cache[n]
+
+        return removeDuplicates(found_list)
+
+    def findLibrary(self, pattern):
+        """ Get the best match for a library glob pattern like
+        "libElementsKernel.so*": the first location that has a match
+        wins and within a location the highest version wins. None is
+        returned if nothing matches """
+        key = ("library", pattern, os.environ.get(VARIABLE["library"], None), "pattern")
+        cached = _getCachedLookup(key)
+        if cached is not None:
+            return cached[0]
+
+        found_list = self.getAllPath(pattern)
+        if not found_list:
+            found_list = self.getAllPath(pattern, DEFAULT_INSTALL_LOCATIONS["library"], False)
+        result = next(iter(found_list), None)
+
+        _setCachedLookup(key, result)
+        return result
+
+
+_library_resolver = None
+
+_library_lock = threading.Lock()
+
+
+def getLibraryResolver():
+    """ Get the LibraryResolver shared by the process """
+    global _library_resolver  # pylint: disable=global-statement
+    with _library_lock:
+        if _library_resolver is None:
+            _library_resolver = LibraryResolver()
+        return _library_resolver
+
+
+def findLibrary(pattern):
+    """ Get the best match for a library glob pattern like
+    "libElementsKernel.so*" (see LibraryResolver.findLibrary) """
+    return getLibraryResolver().findLibrary(pattern)
@@ -0,0 +1,219 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+"""
+:file: python/ElementsKernel/Pipeline.py
+
+:date: Oct 18, 2026
+
+In-process runner of a sequence of Elements Python programs. Each stage is
+run by its own ElementsKernel.Program instance, with its own command line
+options and configuration file, inside the same interpreter. The stages
+exchange Python objects through a named in-memory store:
+
+    from ElementsKernel.Pipeline import getDataStore
+
+    def mainMethod(args):
+        catalog = getDataStore().get("catalog")
+        ...
+        getDataStore().put("selection", selection)
+
+The ElementsPipeline program runs the stages listed in a file, one stage per
+line with the program module followed by its arguments.
+"""
+
+import os
+import sys
+import shlex
+import argparse
+import threading
+
+import ElementsKernel.Logging as log
+from ElementsKernel.Program import Program
+from ElementsKernel import Exit
+
+
+class DataStore(object):
+    """ Named in-memory store of the objects exchanged by the stages """
+
+    def __init__(self):
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def put(self, name, obj):
+        """ Store an object under a name, replacing the previous one """
+        with self._lock:
+            self._objects[name] = obj
+
+    def get(self, name, default=None):
+        """ Get the object stored under the name """
+        with self._lock:
+            return self._objects.get(name, default)
+
+    def pop(self, name, default=None):
+        """ Remove the object stored under the name and return it """
+        with self._lock:
+            return self._objects.pop(name, default)
+
+    def getNames(self):
+        """ Get the sorted list of the names in the store """
+        with self._lock:
+            return sorted(self._objects)
+
+    def clear(self):
+        """ Remove all the objects """
+        with self._lock:
+            self._objects.clear()
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._objects
+
+
+_data_store = DataStore()
+
+
+def getDataStore():
+    """ Get the store of the running pipeline """
+    return _data_store
+
+
+def setDataStore(store):
+    """ Set the store used by the stages and return the previous one """
+    global _data_store  # pylint: disable=global-statement
+    previous = _data_store
+    _data_store = store
+    return previous
+
+
+class Pipeline(object):
+    """ Sequence of Elements Python programs run in the same interpreter
+
+    :param program_path: the path of the program the stages belong to. The
+        stage names are placed in its directory, which is used for the
+        environment bootstrap and the configuration file lookup
+    :param program_kwargs: the other keyword arguments of the Program class
+        (project and module names, ...). The default search_dirs is the
+        parent of the program directory
+    """
+
+    def __init__(self, program_path=None, store=None, **program_kwargs):
+        if program_path is None:
+            program_path = os.path.realpath(sys.argv[0])
+        self._program_dir = os.path.dirname(program_path)
+        self._store = store if store is not None else DataStore()
+        program_kwargs.setdefault("search_dirs", [os.path.dirname(self._program_dir)])
+        self._program_kwargs = program_kwargs
+        self._stages = []
+        self._logger = log.getLogger('ElementsPipeline')
+
+    def addStage(self, app_module, argv=(), name=None):
+        """ Append a stage
+
+        :param app_module: the name of the program module
+        :param argv: the command line arguments of the stage
+        :param name: the program name of the stage, used for the default
+            configuration file. The default is the last part of the module
+            name
+        """
+        if name is None:
+            name = app_module.split(".")[-1]
+        self._stages.append((name, app_module, list(argv)))
+
+    def getStages(self):
+        """ Get the list of (name, module, arguments) of the stages """
+        return list(self._stages)
+
+    def getDataStore(self):
+        return self._store
+
+    def _runStage(self, name, app_module, argv):
+        stage_path = os.path.join(self._program_dir, name)
+        program = Program(app_module, original_path=stage_path,
+                          argv=[stage_path] + argv, **self._program_kwargs)
+        return program.runProgram()
+
+    def run(self):
+        """ Run the stages in sequence. The run stops at the first stage which
+        does not succeed and its exit code is returned """
+        previous_store = setDataStore(self._store)
+        try:
+            for index, (name, app_module, argv) in enumerate(self._stages):
+                self._logger.info("Running stage %d/%d: %s", index + 1, len(self._stages), name)
+                exit_code = self._runStage(name, app_module, argv)
+                if exit_code not in (None, Exit.Code["OK"]):
+                    self._logger.error("The %s stage failed with the exit code %s", name, exit_code)
+                    return exit_code
+        finally:
+            setDataStore(previous_store)
+        return Exit.Code["OK"]
+
+
+def readPipelineFile(file_name):
+    """ Get the list of (module, arguments) of the stages of a pipeline file.
+    The empty lines and the ones starting with a '#' are skipped """
+    stages = []
+    with open(file_name) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            tokens = shlex.split(line)
+            stages.append((tokens[0], tokens[1:]))
+    return stages
+
+
+def defineSpecificProgramOptions():
+    """
+    @brief Allows to define the (command line and configuration file) options
+    specific to this program
+
+    @details
+        See the Elements documentation for more details.
+    @return
+        An  ArgumentParser.
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('pipeline_file', metavar='pipeline-file',
+                        help='File with one stage per line: the program module followed by its arguments')
+
+    return parser
+
+
+def mainMethod(args):
+    """ The "main" method.
+    This method is the entry point to the program. In this sense, it is
+    similar to a main (and it is why it is called mainMethod()).
+    """
+    logger = log.getLogger('ElementsPipeline')
+
+    try:
+        stages = readPipelineFile(args.pipeline_file)
+    except (IOError, OSError):
+        logger.exception('The pipeline file "%s" cannot be read', args.pipeline_file)
+        return Exit.Code["NOINPUT"]
+    except ValueError:
+        logger.exception('The pipeline file "%s" cannot be parsed', args.pipeline_file)
+        return Exit.Code["DATAERR"]
+
+    pipeline = Pipeline()
+    for app_module, argv in stages:
+        pipeline.addStage(app_module, argv)
+
+    return pipeline.run()
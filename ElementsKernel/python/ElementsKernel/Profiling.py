@@ -0,0 +1,395 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:file: ElementsKernel/Profiling.py
+
+:date: Oct 18, 2026
+
+Profiling helpers used by the ElementsKernel.Program class
+
+'''
+
+import io
+import sys
+import time
+import json
+import pstats
+import resource
+import signal
+import threading
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import builtins
+    from importlib.util import resolve_name
+except ImportError:  # Python 2
+    import __builtin__ as builtins  # pylint: disable=import-error
+    resolve_name = None
+
+# time.perf_counter only exists since Python 3.3
+_clock = getattr(time, "perf_counter", time.time)
+
+# the implicit relative imports of Python 2 are requested with the -1 level
+_DEFAULT_IMPORT_LEVEL = 0 if sys.version_info[0] >= 3 else -1
+
+# name of the run record entry -> name of the getrusage field
+RUSAGE_FIELDS = OrderedDict([("user_cpu_time", "ru_utime"),
+                             ("system_cpu_time", "ru_stime"),
+                             ("max_rss_kib", "ru_maxrss"),
+                             ("block_input_operations", "ru_inblock"),
+                             ("block_output_operations", "ru_oublock"),
+                             ("voluntary_context_switches", "ru_nvcsw"),
+                             ("involuntary_context_switches", "ru_nivcsw")])
+
+
+class PhaseTimer(object):
+    """ Accumulate the wall time spent in named phases. A phase can be
+    entered several times; its durations are summed up. """
+
+    def __init__(self):
+        self._phases = OrderedDict()
+        self._start = _clock()
+
+    @contextmanager
+    def phase(self, name):
+        """ Context manager timing a phase """
+        start = _clock()
+        try:
+            yield
+        finally:
+            self.record(name, _clock() - start)
+
+    def record(self, name, duration):
+        """ Add a duration to a phase """
+        self._phases[name] = self._phases.get(name, 0.0) + duration
+
+    def getPhases(self):
+        """ Get the ordered dictionary of the phase durations """
+        return OrderedDict(self._phases)
+
+    def getElapsed(self):
+        """ Get the time elapsed since the creation of the timer """
+        return _clock() - self._start
+
+    def log(self, logger, level, title="Phase timing"):
+        """ Log the phase durations """
+        logger.log(level, "# %s", title)
+        logger.log(level, "# ---------------------------")
+        for name, duration in self._phases.items():
+            logger.log(level, "# %-40s %10.6f s", name, duration)
+        logger.log(level, "# %-40s %10.6f s", "total elapsed", self.getElapsed())
+
+
+class ImportTimer(object):
+    """ Measure the import time of the modules by wrapping the builtin
+    __import__ function. Only the first import of a module is recorded,
+    with its cumulative time (including the nested imports) and its self
+    time. """
+
+    def __init__(self):
+        self._original_import = None
+        self._stack = []
+        self._records = OrderedDict()
+
+    def start(self):
+        """ Install the timing __import__ """
+        if self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._import
+
+    def stop(self):
+        """ Restore the original __import__ """
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(),  # pylint: disable=redefined-builtin
+                level=_DEFAULT_IMPORT_LEVEL):
+        """ The timing __import__ """
+        module_name = name
+        if level > 0:
+            if resolve_name is None:
+                return self._original_import(name, globals, locals, fromlist, level)
+            try:
+                module_name = resolve_name("." * level + name, (globals or {}).get("__package__", None))
+            except (ImportError, ValueError):
+                module_name = None
+        if not module_name or module_name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        start = _clock()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = _clock() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += cumulative
+            if module_name not in self._records:
+                self._records[module_name] = (cumulative, cumulative - children)
+
+    def getRecords(self):
+        """ Get the ordered dictionary of module name to (cumulative, self) time """
+        return OrderedDict(self._records)
+
+    def log(self, logger, level, top=20):
+        """ Log the modules with the longest cumulative import times """
+        logger.log(level, "# Import time of the %d newly imported modules (top %d)", len(self._records), top)
+        logger.log(level, "# %-50s %10s %10s", "module", "cumul [s]", "self [s]")
+        ranked = sorted(self._records.items(), key=lambda r: r[1][0], reverse=True)
+        for name, (cumulative, self_time) in ranked[:top]:
+            logger.log(level, "# %-50s %10.6f %10.6f", name, cumulative, self_time)
+
+
+def logProfileStats(profiler, output_file, logger, level, top=20):
+    """ Dump the statistics of a cProfile.Profile into a pstats file and log
+    the functions with the longest cumulative times
+
+    :param profiler: the profiler that has been run
+    :param output_file: the path of the pstats file
+    :param logger: the logger to be used
+    :param level: the log level of the summary
+    :param top: the number of functions of the summary
+    """
+    profiler.dump_stats(output_file)
+    logger.log(level, "# cProfile statistics written to %s", output_file)
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(top)
+    for line in stream.getvalue().splitlines():
+        if line.strip():
+            logger.log(level, "# %s", line)
+
+
+def logMemoryTrace(logger, level, top=10):
+    """ Log the peak memory and the top allocation sites recorded by
+    tracemalloc, then stop the tracing
+
+    :param logger: the logger to be used
+    :param level: the log level of the summary
+    :param top: the number of allocation sites of the summary
+    """
+    import tracemalloc  # Python 3.4
+    if not tracemalloc.is_tracing():
+        return
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logger.log(level, "# Traced memory: current %.1f KiB, peak %.1f KiB", current / 1024.0, peak / 1024.0)
+    logger.log(level, "# Top %d allocation sites", top)
+    for stat in snapshot.statistics("lineno")[:top]:
+        frame = stat.traceback[0]
+        logger.log(level, "# %s:%d: %.1f KiB in %d blocks",
+                   frame.filename, frame.lineno, stat.size / 1024.0, stat.count)
+
+
+def getResourceUsage(who=resource.RUSAGE_SELF):
+    """ Get the resource usage of the process or of its terminated children
+
+    :param who: resource.RUSAGE_SELF or resource.RUSAGE_CHILDREN
+    :return: an ordered dictionary with the RUSAGE_FIELDS keys
+    """
+    usage = resource.getrusage(who)
+    return OrderedDict((name, getattr(usage, field)) for name, field in RUSAGE_FIELDS.items())
+
+
+def getRunRecord(wall_time, **kwargs):
+    """ Create the run record with the wall time and the resource usage of
+    the process and of its children
+
+    :param wall_time: the wall time of the run in seconds
+    :param kwargs: extra entries of the record, put at the beginning
+    :return: an ordered dictionary
+    """
+    record = OrderedDict(sorted(kwargs.items()))
+    record["wall_time"] = wall_time
+    record["self"] = getResourceUsage(resource.RUSAGE_SELF)
+    record["children"] = getResourceUsage(resource.RUSAGE_CHILDREN)
+    return record
+
+
+def logRunRecord(record, logger, level):
+    """ Log the resource usage part of a run record """
+    logger.log(level, "# %-30s %14.3f s", "wall time", record["wall_time"])
+    logger.log(level, "# %-30s %14s %14s", "resource", "self", "children")
+    for name in RUSAGE_FIELDS:
+        self_value = record["self"][name]
+        children_value = record["children"][name]
+        if isinstance(self_value, float):
+            logger.log(level, "# %-30s %14.3f %14.3f", name, self_value, children_value)
+        else:
+            logger.log(level, "# %-30s %14d %14d", name, self_value, children_value)
+
+
+def writeRunRecord(record, output_file):
+    """ Write the run record as a JSON file """
+    with open(output_file, "w") as f:
+        json.dump(record, f, indent=2)
+        f.write("\n")
+
+
+def formatThreadStacks():
+    """ Get the lines of the current stacks of all the threads """
+    names = dict((t.ident, t.name) for t in threading.enumerate())
+    lines = []
+    for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+        lines.append("Thread %s (%d):" % (names.get(thread_id, "unknown"), thread_id))
+        for entry in traceback.format_stack(frame):
+            lines.extend(entry.rstrip().splitlines())
+    return lines
+
+
+def logThreadStacks(logger, level):
+    """ Log the current stacks of all the threads """
+    logger.log(level, "# Stacks of the %d threads", len(threading.enumerate()))
+    for line in formatThreadStacks():
+        logger.log(level, "# %s", line)
+
+
+class StackSampler(object):
+    """ Statistical profiler sampling periodically the stacks of all the
+    threads from a background thread. The samples are written in the
+    collapsed stack format of the flame graph tools: one line per distinct
+    stack, with the frames separated by ';' from the root and the number of
+    samples """
+
+    def __init__(self, output_file, interval=0.01):
+        self._output_file = output_file
+        self._interval = interval
+        self._counts = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def getOutputFile(self):
+        return self._output_file
+
+    def isRunning(self):
+        return self._thread is not None
+
+    def start(self):
+        """ Start the sampling. The previous samples are kept """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ElementsStackSampler")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """ Stop the sampling and write the collapsed stacks """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.write()
+
+    def toggle(self):
+        """ Start or stop the sampling. Return True if it has been started """
+        if self.isRunning():
+            self.stop()
+            return False
+        self.start()
+        return True
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self._interval):
+            names = dict((t.ident, t.name) for t in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append("%s (%s:%d)" % (code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, "thread-%d" % thread_id))
+                key = ";".join(reversed(stack))
+                self._counts[key] = self._counts.get(key, 0) + 1
+
+    def getCounts(self):
+        """ Get the dictionary of the collapsed stacks to their number of samples """
+        return dict(self._counts)
+
+    def write(self):
+        """ Write the collapsed stacks """
+        with open(self._output_file, "w") as f:
+            for key, count in sorted(self._counts.items()):
+                f.write("%s %d\n" % (key, count))
+
+
+class DebugSignals(object):
+    """ Signal handlers for the live inspection of a program: the first signal
+    logs the stacks of all the threads and the second one starts or stops a
+    StackSampler """
+
+    def __init__(self, logger, level, sampler_output,
+                 stack_signal=signal.SIGUSR1, sampler_signal=signal.SIGUSR2):
+        self._logger = logger
+        self._level = level
+        self._sampler = StackSampler(sampler_output)
+        self._signals = {stack_signal: self._dumpStacks,
+                         sampler_signal: self._toggleSampler}
+        self._old_handlers = {}
+        self._toggle_lock = threading.Lock()
+        self._toggle_threads = []
+
+    def getSampler(self):
+        return self._sampler
+
+    def install(self):
+        """ Install the handlers. It has to be called from the main thread """
+        for signum, handler in self._signals.items():
+            self._old_handlers[signum] = signal.signal(signum, handler)
+
+    def uninstall(self):
+        """ Restore the previous handlers and stop the sampler """
+        for signum, handler in self._old_handlers.items():
+            signal.signal(signum, handler)
+        self._old_handlers = {}
+        for thread in self._toggle_threads:
+            thread.join()
+        self._toggle_threads = []
+        with self._toggle_lock:
+            if self._sampler.isRunning():
+                self._sampler.stop()
+                self._logger.log(self._level, "# Stack samples written to %s", self._sampler.getOutputFile())
+
+    def _dumpStacks(self, *_):
+        # the logging is done from another thread to avoid the re-entrance of
+        # the handlers if the signal arrived while logging
+        thread = threading.Thread(target=logThreadStacks, args=(self._logger, self._level),
+                                  name="ElementsStackDump")
+        thread.start()
+
+    def _toggleSampler(self, *_):
+        # as for the stacks, the sampler thread is joined, the samples are
+        # written and the logging is done from another thread
+        thread = threading.Thread(target=self._runToggle, name="ElementsSamplerToggle")
+        self._toggle_threads.append(thread)
+        thread.start()
+
+    def _runToggle(self):
+        with self._toggle_lock:
+            if self._sampler.toggle():
+                self._logger.log(self._level, "# Stack sampling started")
+            else:
+                self._logger.log(self._level, "# Stack samples written to %s", self._sampler.getOutputFile())
@@ -18,17 +18,46 @@
 
 """Main Program Class Module"""
 
+import argparse
 import importlib
+import inspect
+import cProfile
+import signal
 import os
 import sys
 import re
+import shlex
+import hashlib
+import time
 import ElementsKernel.Logging as log
 import logging
-from ElementsKernel.Path import VARIABLE, SUFFIXES, joinPath, multiPathAppend
+from ElementsKernel.Path import VARIABLE, SUFFIXES, joinPath, multiPathAppend, getUniqueLocations
+from ElementsKernel.Path import compactLocations
 from ElementsKernel.Environment import Environment
 from ElementsKernel.Configuration import getConfigurationPath, getConfigurationLocations
+from ElementsKernel.Configuration import readConfigurationCache, writeConfigurationCache
+from ElementsKernel.Profiling import PhaseTimer, ImportTimer, logProfileStats, logMemoryTrace
+from ElementsKernel.Profiling import getRunRecord, logRunRecord, writeRunRecord
+from ElementsKernel.Profiling import DebugSignals
+from ElementsKernel.Metrics import MetricsExporter, FORMATS as METRICS_FORMATS
+from ElementsKernel.ResultCache import ResultCache, getOptionFiles, getOptionFileMap
+from ElementsKernel.ResultCache import CACHE_DIR_VAR, CHECK_MODES
 from ElementsKernel import Exit
 
+PROFILE_STARTUP_OPTION = '--profile-startup'
+
+# environment variables of the thread pools of the numerical libraries
+THREAD_VARIABLES = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                    "NUMEXPR_NUM_THREADS", "NUMEXPR_MAX_THREADS", "VECLIB_MAXIMUM_THREADS"]
+BOOTSTRAP_PRUNE_VAR = 'ELEMENTS_BOOTSTRAP_PRUNE'
+DEBUG_SIGNALS_VAR = 'ELEMENTS_DEBUG_SIGNALS'
+
+# duration above which a callback of the event loop of a coroutine
+# mainMethod is reported (with the DEBUG log level only)
+SLOW_CALLBACK_DURATION = 0.1
+
+_CONFIG_VALUE_RE = re.compile(r'''((?:[^ "']|"[^"]*"|'[^']*')+)''')
+
 
 def str_to_bool(s):
     """Convert string to bool (in argparse context)."""
@@ -37,6 +66,100 @@ def str_to_bool(s):
     return {'true': True, 'false': False}[s.lower()]
 
 
+def _initWorker(log_queue, log_level):
+    """ Initialize a worker process of the --processes mode: the interruptions are
+    left to the parent process and the log records are sent to it """
+    import logging.handlers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    root_logger.setLevel(log_level)
+
+
+def _terminateWorkers(executor):
+    """ Stop the worker processes of a ProcessPoolExecutor: its shutdown
+    waits for the running work items otherwise """
+    terminate_workers = getattr(executor, "terminate_workers", None)
+    if terminate_workers is not None:
+        # Python 3.14
+        terminate_workers()
+        return
+    for process in list((executor._processes or {}).values()):  # pylint: disable=protected-access
+        process.terminate()
+
+
+def _runWorkItem(app_module_name, item):
+    """ Run the mainMethod of the application module for a work item """
+    app_module = importlib.import_module(app_module_name)
+    result = app_module.mainMethod(item)
+    if inspect.iscoroutine(result):
+        import asyncio
+        result = asyncio.run(result)
+    return result
+
+
+def parseCpuList(cpu_list):
+    """ Convert a CPU list like "0-3,8,10-11" to a sorted list of CPU numbers
+    (in argparse context) """
+    cpus = set()
+    try:
+        for part in cpu_list.split(','):
+            part = part.strip()
+            if '-' in part:
+                first, last = part.split('-', 1)
+                if int(first) > int(last):
+                    raise ValueError(part)
+                cpus.update(range(int(first), int(last) + 1))
+            else:
+                cpus.add(int(part))
+    except ValueError:
+        raise argparse.ArgumentTypeError('Invalid CPU list: %r' % cpu_list)
+    if not cpus or min(cpus) < 0:
+        raise argparse.ArgumentTypeError('Invalid CPU list: %r' % cpu_list)
+    return sorted(cpus)
+
+
+def parsePositiveFloat(value):
+    """ Convert a string to a strictly positive float (in argparse context) """
+    try:
+        result = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('Invalid number: %r' % value)
+    if not result > 0:
+        raise argparse.ArgumentTypeError('Not a positive number: %r' % value)
+    return result
+
+
+class _EarlyArgumentParser(argparse.ArgumentParser):
+    """ Argument parser raising a ValueError instead of exiting """
+
+    def error(self, message):
+        raise ValueError(message)
+
+
+def _lenientType(type_func):
+    """ Get a conversion function returning None for the invalid values """
+    def convert(value):
+        try:
+            return type_func(value)
+        except (ValueError, argparse.ArgumentTypeError):
+            return None
+    return convert
+
+
+def getAsyncWorkers():
+    """ Get the size of the default executor of the event loop of a coroutine
+    mainMethod. The blocking calls (file access, subprocesses) are expected to
+    wait most of the time: several threads per available CPU are used """
+    if hasattr(os, "sched_getaffinity"):
+        cpu_number = len(os.sched_getaffinity(0))
+    else:
+        cpu_number = os.cpu_count() or 1
+    return min(64, 4 * cpu_number)
+
+
 class Program(object):
     """Main Program Class"""
 
@@ -46,9 +169,42 @@ class Program(object):
                  elements_module_name=None, elements_module_version=None,
                  search_dirs=None, original_path="",
                  elements_loglevel=logging.DEBUG,
-                 use_config_file=True):
-        self._app_module = importlib.import_module(app_module)
+                 use_config_file=True, argv=None):
+        self._timer = PhaseTimer()
+        # the command line of the program: sys.argv by default
+        if argv is None:
+            argv = sys.argv
+        self._argv = list(argv)
         self._logger = log.getLogger('ElementsProgram')
+        self._env = Environment()
+        self._thread_env_saved = {}
+        self._affinity_saved = None
+        # some options are pre-parsed from the command line to be applied
+        # before the import of the application module
+        self._early_options = self._parseEarlyOptions()
+        self._import_timer = None
+        if self._early_options.profile_startup:
+            self._import_timer = ImportTimer()
+            self._import_timer.start()
+        self._setThreadResources(self._early_options.threads, self._early_options.cpu_affinity)
+        with self._timer.phase("application module import"):
+            self._app_module = importlib.import_module(app_module)
+        self._profile_startup = False
+        self._profile_output = None
+        self._profiler = None
+        self._trace_memory = False
+        self._run_record_file = None
+        self._start_time = time.time()
+        self._arg_parser = None
+        self._config_options = []
+        self._batch_results = []
+        self._option_actions = {}
+        self._option_parser = None
+        self._generic_dests = set()
+        self._generic_options = None
+        self._result_cache = None
+        self._debug_signals = None
+        self._metrics_exporter = None
         self._elements_loglevel = elements_loglevel
         self._use_config_file = use_config_file
         self._parent_project_version = parent_project_version
@@ -59,11 +215,91 @@ class Program(object):
         self._search_dirs = search_dirs
         self._program_path = os.path.dirname(original_path)
         self._program_name = os.path.basename(original_path)
-        self._env = Environment()
+        self._bootstrap_removed = {}
 
     @staticmethod
-    def _setupLogging(arg_parser):
-        options = arg_parser.parse_known_args()[0]
+    def _addEarlyOptions(add_argument):
+        """ Add the generic options that are applied before the import of
+        the application module """
+        add_argument(
+            PROFILE_STARTUP_OPTION, action='store_true',
+            help='Log the time spent in each phase of the program start-up')
+        add_argument(
+            '--threads', type=int, metavar='N',
+            help='Number of threads of the numerical libraries (OpenMP, MKL, OpenBLAS, NumExpr)')
+        add_argument(
+            '--cpu-affinity', type=parseCpuList, metavar='LIST',
+            help='CPUs the program is bound to, e.g. 0-3,8 (default number of threads: '
+                 'the number of CPUs)')
+
+    def _parseEarlyOptions(self):
+        """ Pre-parse the early options from the command line only: the
+        application options are not known yet and they may use the same
+        option strings. The values which cannot be converted are ignored,
+        the final parsing reports the errors """
+        parser_kwargs = {"add_help": False}
+        if sys.version_info >= (3, 5):
+            parser_kwargs["allow_abbrev"] = False
+        parser = _EarlyArgumentParser(**parser_kwargs)
+
+        def addLenientArgument(*option_strings, **kwargs):
+            if 'type' in kwargs:
+                kwargs['type'] = _lenientType(kwargs['type'])
+            parser.add_argument(*option_strings, **kwargs)
+
+        self._addEarlyOptions(addLenientArgument)
+        try:
+            return parser.parse_known_args(self._argv[1:])[0]
+        except ValueError:
+            return parser.parse_known_args([])[0]
+
+    def _setThreadResources(self, threads, cpu_affinity):
+        """ Set the thread variables of the numerical libraries and the CPU
+        affinity of the process. Without an explicit number of threads, the
+        number of CPUs of the affinity is used for the variables which are
+        not already set """
+        if cpu_affinity:
+            if hasattr(os, "sched_setaffinity"):
+                try:
+                    if self._affinity_saved is None:
+                        self._affinity_saved = os.sched_getaffinity(0)
+                    os.sched_setaffinity(0, cpu_affinity)
+                except OSError as e:
+                    self._logger.warning("The CPU affinity cannot be set to %s: %s", cpu_affinity, e)
+            else:
+                self._logger.warning("The CPU affinity is not supported on this platform")
+        if threads is not None:
+            if threads < 1:
+                self._logger.warning("Invalid number of threads: %d", threads)
+                return
+            for name in THREAD_VARIABLES:
+                self._thread_env_saved.setdefault(name, os.environ.get(name, None))
+                self._env[name] = str(threads)
+        elif cpu_affinity:
+            for name in THREAD_VARIABLES:
+                if name not in os.environ:
+                    self._thread_env_saved.setdefault(name, None)
+                    self._env[name] = str(len(cpu_affinity))
+
+    def _resetThreadResources(self):
+        """ Restore the thread variables and the CPU affinity changed by
+        _setThreadResources """
+        for name, value in self._thread_env_saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+                self._env.old_values.pop(name, None)
+            else:
+                self._env[name] = value
+        self._thread_env_saved = {}
+        if self._affinity_saved is not None:
+            try:
+                os.sched_setaffinity(0, self._affinity_saved)
+            except OSError as e:
+                self._logger.warning("The CPU affinity cannot be restored: %s", e)
+            self._affinity_saved = None
+
+    @staticmethod
+    def _setupLogging(options):
         if options.log_level:
             log.setLevel(options.log_level.upper())
         if options.log_file:
@@ -78,7 +314,7 @@ class Program(object):
             rel_path = rel_path.replace('.', os.sep)
         # Get the name of the executable, remove the prefix and change the
         # extension to .conf
-        name = os.path.splitext(os.path.basename(sys.argv[0]))[0] + '.conf'
+        name = os.path.splitext(os.path.basename(self._argv[0]))[0] + '.conf'
         if rel_path:
             rel_path = rel_path + os.sep + name
         else:
@@ -91,6 +327,10 @@ class Program(object):
         return conf_file
 
     def getDefaultConfigFile(self, program_name, module_name):
+        with self._timer.phase("configuration file discovery"):
+            return self._getDefaultConfigFile(program_name, module_name)
+
+    def _getDefaultConfigFile(self, program_name, module_name):
 
         conf_name = os.path.splitext(program_name)[0] + '.conf'
 
@@ -116,32 +356,63 @@ class Program(object):
 
         return default_config_file
 
-    def _parseConfigFile(self, arg_parser):
+    def _parseConfigFile(self, arg_parser, generic_options):
         # First we check if the user gave the --config-file option
-        config_file = arg_parser.parse_known_args()[0].config_file
+        config_file = generic_options.config_file
         if not config_file:
             config_file = self.getDefaultConfigFile(self._program_name,
                                                     self._elements_module_name)
         conf = []
         if config_file:
-            with open(config_file) as f:
-                for line in f.readlines():
-                    line = line.strip()
-                    if line.startswith('#') or not '=' in line:
-                        continue
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    # If the key is not mapping to any of the actions defined in
-                    # the parser, fail with an error messsage
-                    if not [act for act in arg_parser._actions if ('--' + key) in act.option_strings]:
-                        self._logger.error('Unknown option "{}" in configuration file {}'.format(key, config_file))
-                        exit(Exit.Code["NOT_OK"])
-                    value = value.strip()
-                    if '#' in value:
-                        value = value[:value.find('#')]
-                    conf.append('--' + key)
-                    for v in re.split(r'''((?:[^ "']|"[^"]*"|'[^']*')+)''', value)[1::2]:
-                        conf.append(v)
+            with self._timer.phase("configuration file parsing"):
+                conf = self._readConfigFile(config_file, arg_parser)
+        return conf
+
+    def _getOptionActions(self, arg_parser):
+        """ Get the dictionary of option string to action. It is built once
+        per parser """
+        if self._option_parser is not arg_parser:
+            self._option_actions = dict((opt, act) for act in arg_parser._actions
+                                        for opt in act.option_strings)
+            self._option_parser = arg_parser
+        return self._option_actions
+
+    def _getParserSignature(self, arg_parser):
+        """ Get a hash of the option strings of the parser """
+        options = sorted(self._getOptionActions(arg_parser))
+        return hashlib.sha1("\0".join(options).encode()).hexdigest()
+
+    def _readConfigFile(self, config_file, arg_parser):
+        """ Get the tokens of the configuration file, from the on-disk cache
+        if the file and the parser did not change """
+        signature = self._getParserSignature(arg_parser)
+        conf = readConfigurationCache(config_file, signature)
+        if conf is None:
+            conf = self._tokenizeConfigFile(config_file, arg_parser)
+            writeConfigurationCache(config_file, signature, conf)
+        return conf
+
+    def _tokenizeConfigFile(self, config_file, arg_parser):
+        option_actions = self._getOptionActions(arg_parser)
+        conf = []
+        with open(config_file) as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('#') or not '=' in line:
+                    continue
+                key, value = line.split('=', 1)
+                key = key.strip()
+                # If the key is not mapping to any of the actions defined in
+                # the parser, fail with an error messsage
+                if ('--' + key) not in option_actions:
+                    self._logger.error('Unknown option "{}" in configuration file {}'.format(key, config_file))
+                    exit(Exit.Code["NOT_OK"])
+                value = value.strip()
+                if '#' in value:
+                    value = value[:value.find('#')]
+                conf.append('--' + key)
+                for v in _CONFIG_VALUE_RE.split(value)[1::2]:
+                    conf.append(v)
         return conf
 
     def _parseParameters(self):
@@ -157,31 +428,118 @@ class Program(object):
             '--log-level', help='Log level: FATAL, ERROR, WARN, INFO (default), DEBUG')
         group.add_argument(
             '--version', action='version', version=self.getVersion())
+        skipped_options = {}
+
+        def addGenericArgument(*option_strings, **kwargs):
+            self._addGenericArgument(arg_parser, group, skipped_options, *option_strings, **kwargs)
+
+        self._addEarlyOptions(addGenericArgument)
+        addGenericArgument(
+            '--profile-output', metavar='FILE',
+            help='Profile the mainMethod with cProfile and write the statistics to this pstats file')
+        addGenericArgument(
+            '--trace-memory', action='store_true',
+            help='Trace the memory allocations and log the peak memory and the top allocation sites')
+        addGenericArgument(
+            '--run-record', metavar='FILE',
+            help='Write the wall time and the resource usage of the run to this JSON file')
+        addGenericArgument(
+            '--batch', metavar='FILE|-',
+            help='Run the program for each line of this file (or of the standard input) '
+                 'containing the command line arguments of an item')
+        addGenericArgument(
+            '--processes', type=int, default=1, metavar='N',
+            help='Number of processes running the work items returned by the splitWork '
+                 'function of the program module')
+        addGenericArgument(
+            '--result-cache', metavar='DIR', default=os.environ.get(CACHE_DIR_VAR, None),
+            help='Directory of the result cache of the programs declaring their input and '
+                 'output file options (default: the %s environment variable)' % CACHE_DIR_VAR)
+        addGenericArgument(
+            '--result-cache-check', choices=CHECK_MODES, default=CHECK_MODES[0],
+            help='Identify the input files of the result cache by their content or by their '
+                 'size and modification time')
+        addGenericArgument(
+            '--debug-signals', action='store_true', default=bool(os.environ.get(DEBUG_SIGNALS_VAR, "")),
+            help='Log the stacks of all the threads on SIGUSR1 and start or stop a stack sampler '
+                 'on SIGUSR2 (default: set by the %s environment variable)' % DEBUG_SIGNALS_VAR)
+        addGenericArgument(
+            '--sampler-output', metavar='FILE',
+            help='Collapsed stacks file of the SIGUSR2 sampler (default: <program>.<pid>.collapsed)')
+        addGenericArgument(
+            '--metrics-file', metavar='FILE',
+            help='File where the metrics of the program are periodically written')
+        addGenericArgument(
+            '--metrics-format', choices=METRICS_FORMATS, default=METRICS_FORMATS[0],
+            help='Format of the metrics file: OpenMetrics text (replaced at each flush) '
+                 'or JSON lines (one line appended at each flush)')
+        addGenericArgument(
+            '--metrics-interval', type=parsePositiveFloat, default=10.0, metavar='SECONDS',
+            help='Interval between two flushes of the metrics')
+        self._generic_dests = set(a.dest for a in group._group_actions)
+        # Single pre-parsing of the command line for the generic options
+        with self._timer.phase("argument parsing (generic pass)"):
+            generic_options = arg_parser.parse_known_args(self._argv[1:])[0]
         # Setup the logging
-        self._setupLogging(arg_parser)
+        self._setupLogging(generic_options)
         # Get the options from the config file
         if self._use_config_file:
-            options = self._parseConfigFile(arg_parser)
+            options = self._parseConfigFile(arg_parser, generic_options)
         else:
             options = []
+        # Keep the parser and the configuration file options for the batch items
+        self._arg_parser = arg_parser
+        self._config_options = list(options)
         # Append any options passed by the user in the command line. Because they
         # are after the ones from the configuration file, they are going to
         # override them (argparse behavior)
-        options.extend(sys.argv[1:])
+        options.extend(self._argv[1:])
         # Now redo the parsing with all the options
-        all_options = arg_parser.parse_args(options)
+        with self._timer.phase("argument parsing (final pass)"):
+            all_options = arg_parser.parse_args(options)
+
+        # The values of the generic options, the skipped ones keeping their
+        # default value
+        self._generic_options = argparse.Namespace(**skipped_options)
+        for dest in self._generic_dests:
+            if hasattr(all_options, dest):
+                setattr(self._generic_options, dest, getattr(all_options, dest))
+
+        return all_options, self._getVariableToOptionName(all_options, arg_parser)
+
+    def _addGenericArgument(self, arg_parser, group, skipped_options, *option_strings, **kwargs):
+        """ Add a generic option to the group. The option strings already
+        defined by the application parser are left to it and the option is
+        skipped if none remains or if its destination is already used. The
+        default value of the skipped options is recorded """
+        kwargs.setdefault('dest', option_strings[0].lstrip('-').replace('-', '_'))
+        app_dests = set(a.dest for a in arg_parser._actions)
+        free_strings = [o for o in option_strings if o not in arg_parser._option_string_actions]
+        if not free_strings or kwargs['dest'] in app_dests:
+            self._logger.debug("The %s generic option is skipped: it is defined by the %s module",
+                               option_strings[0], self._app_module.__name__)
+            default = kwargs.get('default', None)
+            if kwargs.get('action', None) == 'store_true' and default is None:
+                default = False
+            skipped_options[kwargs['dest']] = default
+            return
+        group.add_argument(*free_strings, **kwargs)
+
+    @staticmethod
+    def _getVariableToOptionName(all_options, arg_parser):
+        """ Create a map of the variable names to the option names to be used
+        for further references """
+        # Index the first action with option strings of each variable
+        dest_actions = {}
+        for a in arg_parser._actions:
+            if a.option_strings and a.dest not in dest_actions:
+                dest_actions[a.dest] = a
 
-        # We create a map of the variable names to the option names to be used
-        # for further references
         variable_to_option_name = {}
         # Iterate through the names of the variables keeping the option values
-        for var in [v for v in dir(all_options) if not v.startswith('_')]:
+        for var in [v for v in vars(all_options) if not v.startswith('_')]:
             # We get the related action from the argparser
-            action = None
-            for a in arg_parser._actions:
-                if a.dest == var and a.option_strings:
-                    action = a
-                    break
+            action = dest_actions.get(var, None)
 
             if action:
                 # We chose as name the longest option name and we strip any leading '-'
@@ -192,7 +550,7 @@ class Program(object):
                 # variable name
                 variable_to_option_name[var] = var
 
-        return all_options, variable_to_option_name
+        return variable_to_option_name
 
     def _logHeader(self):
         self._logger.log(self._elements_loglevel,
@@ -209,11 +567,15 @@ class Program(object):
         self._logger.debug("# Program Path: %s", self._program_path)
         self._logger.debug("#")
 
-    def _logFooter(self):
+    def _logFooter(self, run_record=None):
         self._logger.log(self._elements_loglevel,
             "##########################################################")
         self._logger.log(self._elements_loglevel,
                          "#")
+        if run_record:
+            logRunRecord(run_record, self._logger, self._elements_loglevel)
+            self._logger.log(self._elements_loglevel,
+                             "#")
         self._logger.log(self._elements_loglevel,
             "#    Python program: %s stops ", self._app_module.__name__)
         self._logger.log(self._elements_loglevel,
@@ -244,6 +606,9 @@ class Program(object):
 
         for v in VARIABLE:
             self._logger.debug("%s: %s", VARIABLE[v], self._env[VARIABLE[v]])
+        for name, removed in self._bootstrap_removed.items():
+            if removed:
+                self._logger.debug("%s: %d entries removed by the bootstrap", name, removed)
 
         self._logger.debug("#")
 
@@ -256,7 +621,7 @@ class Program(object):
         return version
 
     def _bootStrapEnvironment(self):
-        self._program_path = os.path.dirname(os.path.realpath(sys.argv[0]))
+        self._program_path = os.path.dirname(os.path.realpath(self._argv[0]))
 
         local_search_paths = [os.path.realpath(p) for p in self._search_dirs]
 
@@ -265,38 +630,422 @@ class Program(object):
         if local_search_paths[0] != this_parent_path:
             local_search_paths.insert(0, this_parent_path)
 
+        local_search_paths = getUniqueLocations(local_search_paths)
+
+        # The variables are compacted: the duplicated entries are removed,
+        # keeping the first one, and the new entries are only appended if
+        # they are not already there. Running the bootstrap again (nested
+        # programs) leaves the variables unchanged.
+        prune = bool(os.environ.get(BOOTSTRAP_PRUNE_VAR, ""))
+        self._bootstrap_removed = {}
         for name, value in VARIABLE.items():
+            appended = multiPathAppend(local_search_paths, SUFFIXES[name])
             if value in os.environ:
-                self._env[value] += os.pathsep + joinPath(multiPathAppend(local_search_paths, SUFFIXES[name]))
+                existing = self._env[value].split(os.pathsep)
+                compacted, removed = compactLocations(existing, prune)
+                self._bootstrap_removed[value] = removed
+                compacted, _ = compactLocations(compacted + appended, prune)
+                if compacted != existing:
+                    self._env[value] = joinPath(compacted)
             else:
-                self._env[value] = joinPath(multiPathAppend(local_search_paths, SUFFIXES[name]))
+                self._env[value] = joinPath(compactLocations(appended, prune)[0])
+
+    def getBootstrapStats(self):
+        """ Get the number of entries removed from each environment variable
+        by the bootstrap compaction """
+        return dict(self._bootstrap_removed)
 
     def _setup(self):
 
-        self._bootStrapEnvironment()
+        with self._timer.phase("environment bootstrap"):
+            self._bootStrapEnvironment()
 
         args, names = self._parseParameters()
-        self._logHeader()
-        self._logAllOptions(args, names)
-        self._logTheEnvironment()
+        generic = self._generic_options
+        self._profile_startup = generic.profile_startup
+        if (generic.threads, generic.cpu_affinity) != (self._early_options.threads,
+                                                       self._early_options.cpu_affinity):
+            # given in the configuration file, abbreviated or defined by the
+            # application module
+            self._resetThreadResources()
+            if generic.threads is not None or generic.cpu_affinity:
+                self._logger.warning("The --threads and --cpu-affinity options are applied after the import "
+                                     "of the application module: they should be given in full on the "
+                                     "command line")
+                self._setThreadResources(generic.threads, generic.cpu_affinity)
+        self._profile_output = generic.profile_output
+        self._trace_memory = generic.trace_memory
+        self._run_record_file = generic.run_record
+        if generic.result_cache and hasattr(self._app_module, "defineCachedFileOptions"):
+            self._result_cache = ResultCache(generic.result_cache, generic.result_cache_check)
+        if self._trace_memory:
+            try:
+                import tracemalloc
+                tracemalloc.start()
+            except ImportError:
+                self._logger.warning("The --trace-memory option needs Python 3.4: it is ignored")
+                self._trace_memory = False
+        if generic.debug_signals:
+            self._installDebugSignals(generic.sampler_output)
+        if generic.metrics_file:
+            self._metrics_exporter = MetricsExporter(generic.metrics_file, generic.metrics_interval,
+                                                     generic.metrics_format)
+            self._metrics_exporter.start()
+        with self._timer.phase("header, options and environment logging"):
+            self._logHeader()
+            self._logAllOptions(args, names)
+            self._logTheEnvironment()
+        if self._import_timer:
+            self._import_timer.stop()
         return args, names
 
+    def _logStartupProfile(self):
+        self._logger.log(self._elements_loglevel,
+                         "##########################################################")
+        self._logger.log(self._elements_loglevel, "#")
+        self._timer.log(self._logger, self._elements_loglevel, "Start-up profile")
+        if self._import_timer:
+            self._logger.log(self._elements_loglevel, "#")
+            self._import_timer.log(self._logger, self._elements_loglevel)
+        self._logger.log(self._elements_loglevel, "#")
+
+    def _installDebugSignals(self, sampler_output):
+        if not sampler_output:
+            program_name = self._program_name or self._app_module.__name__
+            sampler_output = "%s.%d.collapsed" % (os.path.splitext(program_name)[0], os.getpid())
+        self._debug_signals = DebugSignals(self._logger, self._elements_loglevel,
+                                           os.path.abspath(sampler_output))
+        try:
+            self._debug_signals.install()
+        except ValueError:
+            self._logger.warning("The debug signal handlers can only be installed in the main thread")
+            self._debug_signals = None
+
     def _tearDown(self, exit_code):
 
         if exit_code is not None:
             self._logger.debug("# Exit Code: %d", exit_code)
-        self._logFooter()
+        if self._debug_signals:
+            self._debug_signals.uninstall()
+            self._debug_signals = None
+        if self._metrics_exporter:
+            try:
+                self._metrics_exporter.stop()
+            except (IOError, OSError):
+                self._logger.exception("The final metrics cannot be written")
+            self._metrics_exporter = None
+        if self._profile_startup:
+            self._logStartupProfile()
+        if self._profiler:
+            logProfileStats(self._profiler, self._profile_output,
+                            self._logger, self._elements_loglevel)
+        if self._trace_memory:
+            logMemoryTrace(self._logger, self._elements_loglevel)
+        run_record = getRunRecord(self._timer.getElapsed(),
+                                  program=self._program_name,
+                                  module=self._app_module.__name__,
+                                  start_time=self._start_time,
+                                  exit_code=exit_code,
+                                  bootstrap_removed=self._bootstrap_removed)
+        if self._run_record_file:
+            try:
+                writeRunRecord(run_record, self._run_record_file)
+            except (IOError, OSError):
+                self._logger.exception('The run record cannot be written to "%s"', self._run_record_file)
+        self._logFooter(run_record)
 
     def getProgramName(self):
         return self._program_name
 
+    def _runMainMethod(self, args):
+        if self._result_cache:
+            return self._runCachedMainMethod(args)
+        return self._callMainMethod(args)
+
+    def _runCachedMainMethod(self, args):
+        """ Restore the outputs and the exit code of an identical previous run
+        from the result cache or run the mainMethod and store its results if
+        it succeeded """
+        input_options, output_options = self._app_module.defineCachedFileOptions()
+        options = dict((k, v) for k, v in vars(args).items() if k not in self._generic_dests)
+        key = self._result_cache.getKey(self._app_module.__name__, options,
+                                        getOptionFiles(args, input_options), self.getVersion())
+        if key is None:
+            self._logger.warning("The input files cannot be read: the result cache is not used")
+            return self._callMainMethod(args)
+
+        record = self._result_cache.lookup(key)
+        if record is not None:
+            try:
+                exit_code = self._result_cache.restore(record, getOptionFileMap(args, output_options))
+                self._logger.info("The results of the run %s are restored from the result cache", key)
+                return exit_code
+            except (IOError, OSError):
+                self._logger.exception("The results of the run %s cannot be restored", key)
+
+        exit_code = self._callMainMethod(args)
+        if exit_code in (None, Exit.Code["OK"]):
+            try:
+                self._result_cache.store(key, exit_code, getOptionFileMap(args, output_options))
+                self._logger.debug("The results of the run %s are stored in the result cache", key)
+            except (IOError, OSError):
+                self._logger.exception("The results of the run %s cannot be stored", key)
+        return exit_code
+
+    def _callMainMethod(self, args):
+        main_method = self._app_module.mainMethod
+        if getattr(inspect, "iscoroutinefunction", lambda f: False)(main_method):
+            main_method = self._runAsyncMainMethod
+        if self._profile_output:
+            if self._profiler is None:
+                self._profiler = cProfile.Profile()
+            return self._profiler.runcall(main_method, args)
+        return main_method(args)
+
+    def _runAsyncMainMethod(self, args):
+        """ Run a coroutine mainMethod on a new event loop. SIGINT and SIGTERM
+        cancel the coroutine and the slow callbacks are reported when the
+        DEBUG log level is enabled """
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        loop = asyncio.new_event_loop()
+        # the loop has to be the current one for the child watcher of the
+        # subprocesses before Python 3.8
+        asyncio.set_event_loop(loop)
+        executor = ThreadPoolExecutor(max_workers=getAsyncWorkers())
+        loop.set_default_executor(executor)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            loop.set_debug(True)
+            loop.slow_callback_duration = SLOW_CALLBACK_DURATION
+
+        main_task = loop.create_task(self._app_module.mainMethod(args))
+        interruptions = []
+
+        def interrupt(signum):
+            interruptions.append(signum)
+            main_task.cancel()
+
+        handled_signals = []
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, interrupt, signum)
+                handled_signals.append(signum)
+            except (RuntimeError, ValueError, NotImplementedError):
+                # not in the main thread
+                pass
+
+        try:
+            return loop.run_until_complete(main_task)
+        except asyncio.CancelledError:
+            if not interruptions:
+                raise
+            self._logger.error("The %s program has been interrupted by the signal %d",
+                               self._app_module.__name__, interruptions[0])
+            return Exit.Code["NOT_OK"]
+        finally:
+            for signum in handled_signals:
+                loop.remove_signal_handler(signum)
+            if hasattr(asyncio, "all_tasks"):
+                pending = asyncio.all_tasks(loop)
+            else:
+                # before Python 3.7
+                pending = set(t for t in asyncio.Task.all_tasks(loop) if not t.done())
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+            asyncio.set_event_loop(None)
+            # the executor is owned by the program: shutdown_default_executor
+            # is not needed (it only exists since Python 3.9)
+            executor.shutdown(wait=True)
+
+    def _readBatchItems(self, batch_file):
+        """ Get the list of (line number, argument list) of the batch file. The
+        empty lines and the ones starting with a '#' are skipped """
+        if batch_file == '-':
+            lines = sys.stdin.readlines()
+        else:
+            with open(batch_file) as f:
+                lines = f.readlines()
+        items = []
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            items.append((line_number, shlex.split(line)))
+        return items
+
+    def _runBatchItem(self, item_argv):
+        """ Parse the arguments of a batch item with the parser and the
+        configuration file options of the program and run the mainMethod.
+        The exceptions and the exits of the mainMethod are logged and turned
+        into an exit code """
+        try:
+            args = self._arg_parser.parse_args(self._config_options + item_argv)
+        except SystemExit:
+            return Exit.Code["USAGE"]
+        exit_code = Exit.Code["NOT_OK"]
+        try:
+            with self._timer.phase("mainMethod"):
+                exit_code = self._runMainMethod(args)
+        except SystemExit as e:
+            # a message given to exit() gives the NOT_OK exit code
+            self._logger.warning("The mainMethod exited: %s", e.code)
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code
+        except Exception:
+            self._logger.exception(sys.exc_info()[1])
+        if exit_code is None:
+            exit_code = Exit.Code["OK"]
+        return exit_code
+
+    def _logBatchResults(self):
+        self._logger.log(self._elements_loglevel,
+                         "##########################################################")
+        self._logger.log(self._elements_loglevel, "#")
+        self._logger.log(self._elements_loglevel, "# Batch items exit codes")
+        self._logger.log(self._elements_loglevel, "# ---------------------------")
+        self._logger.log(self._elements_loglevel, "#")
+        for line_number, item_argv, exit_code in self._batch_results:
+            self._logger.log(self._elements_loglevel, "# line %d: %d (%s)",
+                             line_number, exit_code, " ".join(item_argv))
+        self._logger.log(self._elements_loglevel, "#")
+
+    def _runBatch(self, batch_file):
+        """ Run the mainMethod for each item of the batch file. The exit code
+        is OK only if all the items succeeded """
+        try:
+            items = self._readBatchItems(batch_file)
+        except (IOError, OSError):
+            self._logger.exception('The batch file "%s" cannot be read', batch_file)
+            return Exit.Code["NOINPUT"]
+        except ValueError:
+            self._logger.exception('The batch file "%s" cannot be parsed', batch_file)
+            return Exit.Code["DATAERR"]
+
+        self._batch_results = []
+        for line_number, item_argv in items:
+            self._logger.info("# Batch item at line %d: %s", line_number, " ".join(item_argv))
+            exit_code = self._runBatchItem(item_argv)
+            self._batch_results.append((line_number, item_argv, exit_code))
+
+        self._logBatchResults()
+
+        if [r for r in self._batch_results if r[2] != Exit.Code["OK"]]:
+            return Exit.Code["NOT_OK"]
+        return Exit.Code["OK"]
+
+    def getBatchResults(self):
+        """ Get the list of (line number, argument list, exit code) of the
+        batch items of the last run """
+        return list(self._batch_results)
+
+    def _runWorkItems(self, items, processes):
+        """ Run the mainMethod for each work item in a pool of processes. The
+        results are returned in the order of the items. None is returned if
+        one of the items failed or if the run was interrupted """
+        import multiprocessing
+        import logging.handlers
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        mp_context = multiprocessing.get_context()
+        log_queue = mp_context.Queue()
+        root_logger = logging.getLogger()
+        listener = logging.handlers.QueueListener(log_queue, *root_logger.handlers,
+                                                  respect_handler_level=True)
+        listener.start()
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=mp_context,
+                                       initializer=_initWorker,
+                                       initargs=(log_queue, root_logger.level))
+        results = None
+        futures = []
+        try:
+            futures = [executor.submit(_runWorkItem, self._app_module.__name__, item)
+                       for item in items]
+            results = []
+            for index, future in enumerate(futures):
+                try:
+                    results.append(future.result())
+                except BrokenProcessPool:
+                    self._logger.error("A worker process terminated abruptly")
+                    results = None
+                    break
+                except Exception:
+                    self._logger.exception("The work item %d failed: cancelling the remaining ones", index)
+                    results = None
+                    break
+        except KeyboardInterrupt:
+            self._logger.error("Interrupted: cancelling the remaining work items")
+            results = None
+        finally:
+            # the items which are not started yet are cancelled (the
+            # cancel_futures argument of shutdown needs Python 3.9)
+            for future in futures:
+                future.cancel()
+            if results is None:
+                # the running ones are stopped. The log listener is stopped
+                # before: a killed worker can hold the lock of the log queue
+                listener.stop()
+                _terminateWorkers(executor)
+                executor.shutdown(wait=True)
+            else:
+                executor.shutdown(wait=True)
+                listener.stop()
+            log_queue.close()
+        return results
+
+    def _runParallel(self, args, processes):
+        """ Run the program in the --processes mode. The items given by the
+        splitWork function of the application module are run in parallel
+        and the list of the mainMethod results is given to its mergeResults
+        function, if any. Without mergeResults, the exit code is OK only if
+        all the items succeeded """
+        items = list(self._app_module.splitWork(args))
+        self._logger.info("Running %d work items with %d processes", len(items), processes)
+        with self._timer.phase("mainMethod"):
+            results = self._runWorkItems(items, processes)
+        if results is None:
+            return Exit.Code["NOT_OK"]
+        if hasattr(self._app_module, "mergeResults"):
+            return self._app_module.mergeResults(results)
+        if [r for r in results if r not in (None, Exit.Code["OK"])]:
+            return Exit.Code["NOT_OK"]
+        return Exit.Code["OK"]
+
     def runProgram(self):
 
         args, _ = self._setup()
+        generic = self._generic_options
+
+        # the initializer of the process pool needs Python 3.7
+        parallel = generic.processes > 1 and sys.version_info >= (3, 7)
+        if parallel and hasattr(self._app_module, "splitWork"):
+            exit_code = Exit.Code["NOT_OK"]
+            try:
+                exit_code = self._runParallel(args, generic.processes)
+            except Exception:
+                self._logger.exception(sys.exc_info()[1])
+            self._tearDown(exit_code)
+            return exit_code
+        if generic.processes > 1 and not parallel:
+            self._logger.warning("The --processes option needs Python 3.7: it is ignored")
+        elif parallel:
+            self._logger.warning("The %s module has no splitWork function: the --processes option is ignored",
+                                 self._app_module.__name__)
+
+        if generic.batch:
+            exit_code = self._runBatch(generic.batch)
+            self._tearDown(exit_code)
+            return exit_code
 
         exit_code = Exit.Code["NOT_OK"]
         try:
-            exit_code = self._app_module.mainMethod(args)
+            with self._timer.phase("mainMethod"):
+                exit_code = self._runMainMethod(args)
         except Exception:
             self._logger.exception(sys.exc_info()[1])
 
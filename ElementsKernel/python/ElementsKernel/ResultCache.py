@@ -0,0 +1,194 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:file: ElementsKernel/ResultCache.py
+
+:date: Oct 18, 2026
+
+Local content-addressed store of the results of the Program runs. A run is
+identified by the program module and version, its resolved options and the
+content (or the size and modification time) of its input files. The record
+of a run contains its exit code and the hashes of its output files, indexed
+by their option, which are stored once in the objects directory of the
+cache. The outputs are restored to the paths given by the options of the
+current run.
+
+'''
+
+import os
+import json
+import shutil
+import hashlib
+
+CACHE_DIR_VAR = "ELEMENTS_RESULT_CACHE_DIR"
+CHECK_MODES = ["content", "mtime"]
+# version of the layout of the records, part of the keys
+RECORD_FORMAT = 2
+
+_CHUNK_SIZE = 1 << 20
+
+
+def getFileHash(file_name):
+    """ Get the SHA-256 hash of the content of a file """
+    file_hash = hashlib.sha256()
+    with open(file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def getOptionFileMap(args, option_names):
+    """ Get the dictionary of the option names to the list of the file names
+    they give. The value of an option can be a single name, a list of names
+    or None """
+    option_files = {}
+    for name in option_names:
+        value = getattr(args, name, None)
+        if value is None:
+            continue
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        option_files[name] = [os.path.abspath(f) for f in value]
+    return option_files
+
+
+def getOptionFiles(args, option_names):
+    """ Get the list of the file names given by the options """
+    option_files = getOptionFileMap(args, option_names)
+    return [f for name in option_names for f in option_files.get(name, [])]
+
+
+class ResultCache(object):
+    """ Store of the results of the Program runs """
+
+    def __init__(self, cache_dir, check_mode="content"):
+        if check_mode not in CHECK_MODES:
+            raise Exception("The \"%s\" check mode is not one of %s" % (check_mode, CHECK_MODES))
+        self._cache_dir = cache_dir
+        self._check_mode = check_mode
+
+    def getCacheDir(self):
+        return self._cache_dir
+
+    def _getInputSignature(self, file_name):
+        if self._check_mode == "content":
+            return getFileHash(file_name)
+        st = os.stat(file_name)
+        # st_mtime_ns does not exist with Python 2
+        return "%d:%r" % (st.st_size, getattr(st, "st_mtime_ns", st.st_mtime))
+
+    def getKey(self, module_name, options, input_files, version=""):
+        """ Get the key of a run. None is returned if one of the input files
+        cannot be read
+
+        :param module_name: the name of the program module
+        :param options: the dictionary of the resolved options
+        :param input_files: the list of the input file names
+        :param version: the version of the program
+        """
+        try:
+            inputs = [(f, self._getInputSignature(f)) for f in input_files]
+        except (IOError, OSError):
+            return None
+        key_data = json.dumps({"module": module_name,
+                               "version": version,
+                               "options": options,
+                               "inputs": inputs,
+                               "check": self._check_mode,
+                               "format": RECORD_FORMAT},
+                              sort_keys=True, default=str)
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def _getRecordPath(self, key):
+        return os.path.join(self._cache_dir, "results", key[:2], key + ".json")
+
+    def _getObjectPath(self, object_hash):
+        return os.path.join(self._cache_dir, "objects", object_hash[:2], object_hash)
+
+    @staticmethod
+    def _atomicCopy(source, destination):
+        """ Copy a file through a temporary file in the destination directory """
+        dest_dir = os.path.dirname(destination)
+        if dest_dir and not os.path.isdir(dest_dir):
+            os.makedirs(dest_dir)
+        tmp_path = "%s.%d.tmp" % (destination, os.getpid())
+        try:
+            shutil.copyfile(source, tmp_path)
+            os.rename(tmp_path, destination)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def lookup(self, key):
+        """ Get the record of the run or None if it is not in the cache or if
+        one of its output objects is missing """
+        try:
+            with open(self._getRecordPath(key)) as f:
+                record = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        for object_hashes in record["outputs"].values():
+            for object_hash in object_hashes:
+                if object_hash and not os.path.isfile(self._getObjectPath(object_hash)):
+                    return None
+        return record
+
+    def restore(self, record, output_files):
+        """ Copy back the output files of a record and get its exit code
+
+        :param record: the record of the run
+        :param output_files: the dictionary of the output option names to
+            the list of the file names of the current run
+        """
+        for name, object_hashes in record["outputs"].items():
+            file_names = output_files.get(name, [])
+            if len(file_names) != len(object_hashes):
+                raise IOError("The output files of the \"%s\" option do not match the record" % name)
+            for file_name, object_hash in zip(file_names, object_hashes):
+                if object_hash:
+                    self._atomicCopy(self._getObjectPath(object_hash), file_name)
+        return record["exit_code"]
+
+    def store(self, key, exit_code, output_files):
+        """ Store the output files and the record of a run. The output files
+        which do not exist are recorded without hash
+
+        :param output_files: the dictionary of the output option names to
+            the list of the file names
+        """
+        outputs = {}
+        for name, file_names in output_files.items():
+            object_hashes = []
+            for file_name in file_names:
+                object_hash = None
+                if os.path.isfile(file_name):
+                    object_hash = getFileHash(file_name)
+                    object_path = self._getObjectPath(object_hash)
+                    if not os.path.isfile(object_path):
+                        self._atomicCopy(file_name, object_path)
+                object_hashes.append(object_hash)
+            outputs[name] = object_hashes
+        record_path = self._getRecordPath(key)
+        record_dir = os.path.dirname(record_path)
+        if not os.path.isdir(record_dir):
+            os.makedirs(record_dir)
+        tmp_path = "%s.%d.tmp" % (record_path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump({"exit_code": exit_code, "outputs": outputs}, f, indent=2)
+        os.rename(tmp_path, record_path)
@@ -0,0 +1,110 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+Benchmark of ElementsKernel.Path.pathSearch against a naive os.walk loop.
+
+A synthetic tree is created in a temporary directory and both searches
+look for all the "target.txt" files and for the first one only. It is
+not part of the unit tests. Run it with:
+
+    python PathSearchBenchmark.py --files 100000 --workers 8
+
+:date: Oct 18, 2026
+
+'''
+
+import argparse
+import os
+import time
+
+from ElementsKernel.Temporary import TempDir
+from ElementsKernel.Path import pathSearch
+
+TARGET_NAME = "target.txt"
+
+
+def createTree(root, file_number, files_per_dir, dirs_per_dir):
+    """ Create a balanced tree with file_number files. One file in each
+    hundred is a target """
+    dir_list = [root]
+    created = 0
+    while created < file_number:
+        dir_path = dir_list.pop(0)
+        for i in range(dirs_per_dir):
+            sub_dir = os.path.join(dir_path, "dir%d" % i)
+            os.mkdir(sub_dir)
+            dir_list.append(sub_dir)
+        for i in range(min(files_per_dir, file_number - created)):
+            if created % 100 == 0:
+                name = TARGET_NAME
+            else:
+                name = "file%d.dat" % i
+            with open(os.path.join(dir_path, name), "w"):
+                pass
+            created += 1
+
+
+def naiveSearch(searched_name, root):
+    """ The hand rolled os.walk search """
+    for dir_path, dirs, files in os.walk(root):
+        for name in files + dirs:
+            if name == searched_name:
+                yield os.path.join(dir_path, name)
+
+
+def timeIt(label, function, repeat):
+    """ Run the function repeat times and print the best time """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    print("%-36s %10.4f s  (%s)" % (label, best, result))
+
+
+def main():
+    """ main function of the benchmark """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=100000, help='Number of files in the tree')
+    parser.add_argument('--files-per-dir', type=int, default=100, help='Number of files per directory')
+    parser.add_argument('--dirs-per-dir', type=int, default=4, help='Number of sub-directories per directory')
+    parser.add_argument('--workers', type=int, default=8, help='Number of threads for the parallel search')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of repetitions of each measurement')
+    args = parser.parse_args()
+
+    tmp_dir = TempDir(suffix="pathsearch_bench")
+    root = tmp_dir.path()
+    print("Creating a tree of %d files in %s" % (args.files, root))
+    createTree(root, args.files, args.files_per_dir, args.dirs_per_dir)
+
+    timeIt("os.walk all matches", lambda: len(list(naiveSearch(TARGET_NAME, root))), args.repeat)
+    timeIt("pathSearch all matches", lambda: len(list(pathSearch(TARGET_NAME, root))), args.repeat)
+    timeIt("pathSearch all matches (%d workers)" % args.workers,
+           lambda: len(list(pathSearch(TARGET_NAME, root, workers=args.workers))), args.repeat)
+    timeIt("os.walk first match", lambda: next(naiveSearch(TARGET_NAME, root)) is not None, args.repeat)
+    timeIt("pathSearch first match", lambda: next(pathSearch(TARGET_NAME, root)) is not None, args.repeat)
+
+    del tmp_dir
+
+
+if __name__ == "__main__":
+    main()
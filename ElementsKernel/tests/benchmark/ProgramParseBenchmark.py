@@ -0,0 +1,114 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+Micro-benchmark of the option parsing of ElementsKernel.Program for a
+program with many options.
+
+The former implementation (three parsings of the command line and a scan of
+all the actions for each variable) is compared to the current one (a single
+pre-parsing and an indexed dest to action map). It is not part of the unit
+tests. Run it with:
+
+    python ProgramParseBenchmark.py --options 500
+
+:date: Oct 18, 2026
+
+'''
+
+import argparse
+import timeit
+
+from ElementsKernel.Program import Program
+
+
+def createParser(option_number):
+    """ Create a parser with option_number options and the generic options """
+    parser = argparse.ArgumentParser()
+    for i in range(option_number):
+        parser.add_argument('--option-number-%d' % i, type=int, default=i,
+                            help='Option %d' % i)
+    group = parser.add_argument_group('Generic Options')
+    group.add_argument('--config-file', help='Name of a configuration file')
+    group.add_argument('--log-file', help='Name of a log file')
+    group.add_argument('--log-level', help='Log level')
+    return parser
+
+
+def legacyVariableToOptionName(all_options, arg_parser):
+    """ The former mapping, quadratic in the number of options """
+    variable_to_option_name = {}
+    for var in [v for v in dir(all_options) if not v.startswith('_')]:
+        action = None
+        for a in arg_parser._actions:
+            if a.dest == var and a.option_strings:
+                action = a
+                break
+        if action:
+            variable_to_option_name[var] = max(action.option_strings, key=len).lstrip('-')
+        else:
+            variable_to_option_name[var] = var
+    return variable_to_option_name
+
+
+def legacyParse(parser, argv):
+    """ The former parsing: one pre-parsing for the logging, one for the
+    configuration file and the final one """
+    parser.parse_known_args(argv)
+    parser.parse_known_args(argv)
+    all_options = parser.parse_args(argv)
+    return all_options, legacyVariableToOptionName(all_options, parser)
+
+
+def currentParse(parser, argv):
+    """ The current parsing: one pre-parsing for the generic options and the
+    final one """
+    parser.parse_known_args(argv)
+    all_options = parser.parse_args(argv)
+    return all_options, Program._getVariableToOptionName(all_options, parser)
+
+
+def main():
+    """ main function of the benchmark """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--options', type=int, default=500, help='Number of options of the program')
+    parser.add_argument('--given', type=int, default=50, help='Number of options given in the command line')
+    parser.add_argument('--number', type=int, default=20, help='Number of runs of each measurement')
+    args = parser.parse_args()
+
+    program_parser = createParser(args.options)
+    argv = ['--log-level', 'INFO']
+    for i in range(min(args.given, args.options)):
+        argv += ['--option-number-%d' % i, str(2 * i)]
+
+    assert legacyParse(program_parser, argv) == currentParse(program_parser, argv)
+
+    all_options = program_parser.parse_args(argv)
+    measurements = [
+        ("legacy parsing", lambda: legacyParse(program_parser, argv)),
+        ("current parsing", lambda: currentParse(program_parser, argv)),
+        ("legacy mapping", lambda: legacyVariableToOptionName(all_options, program_parser)),
+        ("current mapping", lambda: Program._getVariableToOptionName(all_options, program_parser))]
+
+    for label, statement in measurements:
+        best = min(timeit.repeat(statement, number=args.number, repeat=3)) / args.number
+        print("%-20s %10.3f ms" % (label, best * 1000.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+import os
+import asyncio
+import unittest
+
+from ElementsKernel.Temporary import TempDir, TempEnv
+from ElementsKernel.AsyncPath import agetPath, agetAllPathFromLocations
+
+
+class AsyncPathTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir_1 = TempDir(suffix="tempdir")
+        self._tmpdir_2 = TempDir(suffix="tempdir")
+
+    def tearDown(self):
+        unittest.TestCase.tearDown(self)
+        del self._tmpdir_1
+        del self._tmpdir_2
+
+    def _createFile(self, *path_parts):
+        file_path = os.path.join(*path_parts)
+        parent_path = os.path.dirname(file_path)
+        if not os.path.exists(parent_path):
+            os.makedirs(parent_path)
+        with open(file_path, "w") as f:
+            f.write("content")
+        return file_path
+
+    @unittest.skipUnless(hasattr(asyncio, "get_running_loop"), "Python 3.7 needed")
+    def testAsyncLookup(self):
+        dir_1 = self._tmpdir_1.path()
+        dir_2 = self._tmpdir_2.path()
+        file_1 = self._createFile(dir_1, "file1")
+        file_2 = self._createFile(dir_2, "file1")
+        sub_file = self._createFile(dir_2, "tata", "file2")
+        env = TempEnv()
+        env["ELEMENTS_AUX_PATH"] = os.pathsep.join(["/non/existing", dir_1, dir_2])
+
+        loop = asyncio.new_event_loop()
+        self.assertEqual(loop.run_until_complete(agetPath("file1", "auxiliary")), file_1)
+        self.assertEqual(loop.run_until_complete(agetPath("tata/file2", "auxiliary")), sub_file)
+        self.assertEqual(loop.run_until_complete(agetPath("file3", "auxiliary", raise_exception=False)), None)
+        self.assertRaises(Exception, loop.run_until_complete, agetPath("file3", "auxiliary"))
+        self.assertEqual(loop.run_until_complete(agetAllPathFromLocations("file1", [dir_1, dir_2])),
+                         [file_1, file_2])
+        loop.close()
+        del env
+
+
+if __name__ == "__main__":
+    unittest.main()
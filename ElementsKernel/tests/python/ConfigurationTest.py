@@ -0,0 +1,73 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import unittest
+
+import os
+
+from ElementsKernel.Temporary import TempDir, TempEnv
+from ElementsKernel.Configuration import getConfigurationCacheDir, pruneConfigurationCache
+from ElementsKernel.Configuration import readConfigurationCache, writeConfigurationCache
+
+
+class ConfigurationTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="tempdir")
+        self._env = TempEnv()
+        self._cache_dir = os.path.join(self._tmpdir.path(), "cache")
+        self._config_file = os.path.join(self._tmpdir.path(), "test.conf")
+        with open(self._config_file, "w") as f:
+            f.write("value = 1\n")
+
+    def tearDown(self):
+        del self._env
+        del self._tmpdir
+        unittest.TestCase.tearDown(self)
+
+    def testCacheOptIn(self):
+        if "ELEMENTS_CONF_CACHE_DIR" in self._env:
+            del self._env["ELEMENTS_CONF_CACHE_DIR"]
+        self.assertEqual(getConfigurationCacheDir(), None)
+        writeConfigurationCache(self._config_file, "sig", ["--value", "1"])
+        self.assertEqual(readConfigurationCache(self._config_file, "sig"), None)
+
+        self._env["ELEMENTS_CONF_CACHE_DIR"] = self._cache_dir
+        writeConfigurationCache(self._config_file, "sig", ["--value", "1"])
+        self.assertEqual(readConfigurationCache(self._config_file, "sig"), ["--value", "1"])
+        self.assertEqual(readConfigurationCache(self._config_file, "other"), None)
+
+    def testPruneCache(self):
+        os.mkdir(self._cache_dir)
+        for i in range(5):
+            entry = os.path.join(self._cache_dir, "%d.json" % i)
+            with open(entry, "w") as f:
+                f.write("[]")
+            os.utime(entry, (1000 + i, 1000 + i))
+        pruneConfigurationCache(self._cache_dir, 3)
+        self.assertEqual(sorted(os.listdir(self._cache_dir)), ["2.json", "3.json", "4.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import unittest
+
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import subprocess
+
+import ElementsKernel
+from ElementsKernel.Temporary import TempDir, TempEnv
+from ElementsKernel.ForkServer import runProgramInServer, createServerSocket
+from ElementsKernel import ForkServer
+
+APP_MODULE_CONTENT = """
+import argparse
+import os
+
+def defineSpecificProgramOptions():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', help='Output file')
+    return parser
+
+def mainMethod(args):
+    with open(args.output, "w") as f:
+        f.write("%s\\n%s\\n" % (os.environ.get("FORK_SERVER_TEST_VALUE"), os.getcwd()))
+    return 3
+"""
+
+SERVER_COMMAND = """
+import sys
+from ElementsKernel.ForkServer import defineSpecificProgramOptions, mainMethod
+sys.exit(mainMethod(defineSpecificProgramOptions().parse_args(sys.argv[1:])))
+"""
+
+
+class ForkServerTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="tempdir")
+        self._env = TempEnv()
+        self._module_name = "ForkServerTestApp"
+        with open(os.path.join(self._tmpdir.path(), self._module_name + ".py"), "w") as f:
+            f.write(APP_MODULE_CONTENT)
+        self._bin_dir = os.path.join(self._tmpdir.path(), "bin")
+        os.mkdir(self._bin_dir)
+        self._socket_path = os.path.join(self._tmpdir.path(), "run", "server.sock")
+        python_path = [os.path.dirname(os.path.dirname(ElementsKernel.__file__)), self._tmpdir.path()]
+        server_env = dict(os.environ)
+        server_env["PYTHONPATH"] = os.pathsep.join(python_path)
+        self._server = subprocess.Popen([sys.executable, "-c", SERVER_COMMAND,
+                                         "--socket", self._socket_path],
+                                        env=server_env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._orig_argv = sys.argv
+        self._orig_cwd = os.getcwd()
+        sys.path.insert(0, self._tmpdir.path())
+        for _ in range(200):
+            if os.path.exists(self._socket_path):
+                break
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self._server.send_signal(signal.SIGINT)
+        self._server.wait()
+        sys.path.remove(self._tmpdir.path())
+        sys.argv = self._orig_argv
+        os.chdir(self._orig_cwd)
+        del self._env
+        del self._tmpdir
+        unittest.TestCase.tearDown(self)
+
+    def testRunProgramInServer(self):
+        self.assertTrue(os.path.exists(self._socket_path))
+        output_file = os.path.join(self._tmpdir.path(), "output.txt")
+        self._env["FORK_SERVER_TEST_VALUE"] = "forked"
+        os.chdir(self._bin_dir)
+        sys.argv = [os.path.join(self._bin_dir, self._module_name), "--output", output_file]
+        program_kwargs = dict(search_dirs=[self._tmpdir.path()],
+                              original_path=sys.argv[0],
+                              use_config_file=False)
+        exit_code = runProgramInServer(self._module_name, program_kwargs, self._socket_path)
+        self.assertEqual(exit_code, 3)
+        with open(output_file) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, ["forked", os.path.realpath(self._bin_dir)])
+
+    def testPrivateSocket(self):
+        socket_dir = os.path.dirname(self._socket_path)
+        os.chmod(socket_dir, 0o755)
+        try:
+            self.assertEqual(runProgramInServer(self._module_name, {}, self._socket_path), None)
+        finally:
+            os.chmod(socket_dir, 0o700)
+        # an existing shared directory is refused by the server
+        shared_dir = os.path.join(self._tmpdir.path(), "shared")
+        os.mkdir(shared_dir)
+        os.chmod(shared_dir, 0o777)
+        self.assertRaises(Exception, createServerSocket, os.path.join(shared_dir, "server.sock"))
+        self.assertEqual(os.listdir(shared_dir), [])
+
+    def testKernelMismatch(self):
+        sys.argv = [os.path.join(self._bin_dir, self._module_name)]
+        get_kernel_location = ForkServer._getKernelLocation
+        ForkServer._getKernelLocation = lambda: "/other/ElementsKernel"
+        try:
+            self.assertEqual(runProgramInServer(self._module_name, {}, self._socket_path), None)
+        finally:
+            ForkServer._getKernelLocation = get_kernel_location
+
+    def testStalledClient(self):
+        server_end, client_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        request_timeout = ForkServer._REQUEST_TIMEOUT
+        ForkServer._REQUEST_TIMEOUT = 0.2
+        try:
+            start = time.time()
+            ForkServer._handleConnection(None, server_end, logging.getLogger("ForkServerTest"))
+            self.assertTrue(time.time() - start < 2)
+        finally:
+            ForkServer._REQUEST_TIMEOUT = request_timeout
+            client_end.close()
+
+    def testNoServer(self):
+        missing_socket = os.path.join(self._tmpdir.path(), "missing.sock")
+        self.assertEqual(runProgramInServer(self._module_name, {}, missing_socket), None)
+        self._env["ELEMENTS_FORK_SERVER_DISABLE"] = "1"
+        self.assertEqual(runProgramInServer(self._module_name, {}, self._socket_path), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
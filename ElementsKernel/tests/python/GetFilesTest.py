@@ -0,0 +1,117 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import unittest
+
+import io
+import os
+from contextlib import redirect_stdout
+
+from ElementsKernel.Temporary import TempDir, TempEnv
+from ElementsKernel.GetFiles import listLocation, streamLocations
+from ElementsKernel.GetFiles import defineSpecificProgramOptions, mainMethod
+from ElementsKernel import Exit
+
+
+class GetFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="tempdir")
+        self._other_dir = TempDir(suffix="tempdir")
+        self._location = self._tmpdir.path()
+        self._files = [self._createFile("a.conf"),
+                       self._createFile("b.txt"),
+                       self._createFile("sub", "c.conf"),
+                       self._createFile("sub", "deep", "d.conf")]
+        # the symbolic links to directories are not followed
+        self._createFile(self._other_dir.path(), "e.conf")
+        os.symlink(self._other_dir.path(), os.path.join(self._location, "link"))
+
+    def tearDown(self):
+        del self._other_dir
+        del self._tmpdir
+        unittest.TestCase.tearDown(self)
+
+    def _createFile(self, *path_parts):
+        file_path = os.path.join(self._location, *path_parts)
+        parent_path = os.path.dirname(file_path)
+        if not os.path.exists(parent_path):
+            os.makedirs(parent_path)
+        with open(file_path, "w") as f:
+            f.write("content")
+        return file_path
+
+    def _listLocation(self, **kwargs):
+        found = []
+        listLocation(self._location, found.extend, **kwargs)
+        return sorted(found)
+
+    def testListLocation(self):
+        self.assertEqual(self._listLocation(), sorted(self._files))
+
+    def testMaxDepth(self):
+        self.assertEqual(self._listLocation(max_depth=0), sorted(self._files[:2]))
+        self.assertEqual(self._listLocation(max_depth=1), sorted(self._files[:3]))
+
+    def testGlob(self):
+        self.assertEqual(self._listLocation(pattern="*.conf"),
+                         sorted([self._files[0], self._files[2], self._files[3]]))
+        self.assertEqual(self._listLocation(pattern="*.conf", max_depth=1),
+                         sorted([self._files[0], self._files[2]]))
+
+    def testStreamLocations(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            file_count = streamLocations([self._location, self._other_dir.path()], False, jobs=2)
+        self.assertEqual(file_count, len(self._files) + 1)
+        # the files are printed in the order of the locations
+        lines = output.getvalue().splitlines()
+        self.assertEqual(sorted(lines[:-1]), sorted(self._files))
+        self.assertEqual(lines[-1], os.path.join(self._other_dir.path(), "e.conf"))
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            file_count = streamLocations([self._other_dir.path(), self._location], False, jobs=2)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], os.path.join(self._other_dir.path(), "e.conf"))
+        self.assertEqual(sorted(lines[1:]), sorted(self._files))
+
+    def testDuplicatedLocations(self):
+        alias = os.path.join(self._other_dir.path(), "alias")
+        os.symlink(self._location, alias)
+        env = TempEnv()
+        env["ELEMENTS_AUX_PATH"] = os.pathsep.join([self._location, self._location + os.sep,
+                                                    alias, self._location])
+        args = defineSpecificProgramOptions().parse_args(["--type", "auxiliary", "--glob", "*.conf"])
+        output = io.StringIO()
+        with redirect_stdout(output):
+            exit_code = mainMethod(args)
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        self.assertEqual(sorted(output.getvalue().splitlines()),
+                         sorted([self._files[0], self._files[2], self._files[3]]))
+        del env
+
+
+if __name__ == '__main__':
+    unittest.main()
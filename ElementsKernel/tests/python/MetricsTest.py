@@ -0,0 +1,105 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import unittest
+
+import os
+import json
+import time
+
+from ElementsKernel.Temporary import TempDir
+from ElementsKernel.Metrics import MetricsRegistry, MetricsExporter
+from ElementsKernel import Metrics
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="tempdir")
+        self._registry = MetricsRegistry()
+
+    def tearDown(self):
+        del self._tmpdir
+        unittest.TestCase.tearDown(self)
+
+    def _fillRegistry(self):
+        items = self._registry.counter("items_processed", "Processed items")
+        items.inc()
+        items.inc(2)
+        queue_size = self._registry.gauge("queue_size")
+        queue_size.set(5)
+        queue_size.dec()
+        latency = self._registry.timer("latency_seconds", buckets=(0.1, 1.0))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(2.0)
+
+    def testMetrics(self):
+        self._fillRegistry()
+        self.assertEqual(self._registry.counter("items_processed").getValue(), 3)
+        self.assertEqual(self._registry.gauge("queue_size").getValue(), 4)
+        latency = self._registry.timer("latency_seconds")
+        self.assertEqual(latency.getCount(), 3)
+        self.assertEqual(latency.getCumulativeBuckets(), [(0.1, 1), (1.0, 2)])
+        self.assertRaises(Exception, self._registry.gauge, "items_processed")
+        self.assertRaises(Exception, self._registry.counter, "bad name")
+        self.assertRaises(Exception, self._registry.counter("items_processed").inc, -1)
+
+    def testOpenMetrics(self):
+        self._fillRegistry()
+        lines = self._registry.formatOpenMetrics().splitlines()
+        self.assertEqual(lines[:3], ["# TYPE items_processed counter",
+                                     "# HELP items_processed Processed items",
+                                     "items_processed_total 3"])
+        self.assertTrue("queue_size 4" in lines)
+        self.assertTrue('latency_seconds_bucket{le="1.0"} 2' in lines)
+        self.assertTrue('latency_seconds_bucket{le="+Inf"} 3' in lines)
+        self.assertTrue("latency_seconds_count 3" in lines)
+        self.assertEqual(lines[-1], "# EOF")
+
+    def testJsonLines(self):
+        self._fillRegistry()
+        output_file = os.path.join(self._tmpdir.path(), "metrics.jsonl")
+        exporter = MetricsExporter(output_file, 0.01, "jsonl", self._registry)
+        exporter.start()
+        time.sleep(0.1)
+        exporter.stop()
+        with open(output_file) as f:
+            records = [json.loads(l) for l in f]
+        self.assertTrue(len(records) > 1)
+        self.assertEqual(records[-1]["metrics"]["items_processed"], 3)
+        self.assertEqual(records[-1]["metrics"]["latency_seconds"]["count"], 3)
+
+    def testInvalidInterval(self):
+        output_file = os.path.join(self._tmpdir.path(), "metrics.txt")
+        for interval in [0, -1.0]:
+            self.assertRaises(Exception, MetricsExporter, output_file, interval)
+
+    def testModuleRegistry(self):
+        self.assertTrue(Metrics.counter("metrics_test_counter") is
+                        Metrics.getRegistry().counter("metrics_test_counter"))
+
+
+if __name__ == '__main__':
+    unittest.main()
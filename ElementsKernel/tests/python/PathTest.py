@@ -22,15 +22,26 @@
 :author: Hubert Degaudenzi
 
 '''
+import os
+import struct
 import unittest
 import subprocess
 
-from ElementsKernel.Temporary import TempDir
+from ElementsKernel.Temporary import TempDir, TempEnv
 from ElementsKernel.Path import joinPath, multiPathAppend, getLocationsFromEnv
 from ElementsKernel.Path import getLocations
-from ElementsKernel.Path import which
+from ElementsKernel.Path import which, whichAll, getWhichIndex
 from ElementsKernel.Path import getTargetPath
 from ElementsKernel.Path import removeDuplicates
+from ElementsKernel.Path import PathIndex, getPath, getAllPathFromLocations
+from ElementsKernel.Path import getManifest, MANIFEST_NAME, MANIFEST_HEADER
+from ElementsKernel.Path import enableManifest, clearManifestCache
+from ElementsKernel.Path import getPaths, getAllPathsFromLocations
+from ElementsKernel.Path import setLookupCacheTTL, invalidateLookupCache
+from ElementsKernel.Path import getLookupStats, resetLookupStats
+from ElementsKernel.Path import getUniqueLocations, compactLocations
+from ElementsKernel.Path import pathSearch
+from ElementsKernel.Path import LibraryResolver, readLinkerCache, getLinkerCacheFlags, VARIABLE
 
 
 class PathTest(unittest.TestCase):
@@ -117,6 +128,283 @@ class PathTest(unittest.TestCase):
                             "/opt/bin", "/opt/local/bin"]
         self.assertEqual(removeDuplicates(locations), unique_locations)
 
+    def _createFile(self, *path_parts):
+        file_path = os.path.join(*path_parts)
+        parent_path = os.path.dirname(file_path)
+        if not os.path.exists(parent_path):
+            os.makedirs(parent_path)
+        with open(file_path, "w") as f:
+            f.write("content")
+        return file_path
+
+    def testPathIndex(self):
+        dir_1 = self._tmpdir_1.path()
+        dir_2 = self._tmpdir_2.path()
+        file_1 = self._createFile(dir_1, "file1")
+        file_2 = self._createFile(dir_2, "file1")
+        sub_file = self._createFile(dir_2, "tata", "tutu", "file2")
+
+        env = TempEnv()
+        env["ELEMENTS_AUX_PATH"] = os.pathsep.join([dir_1, dir_2])
+
+        index = PathIndex("auxiliary", with_defaults=False, check_interval=0.0)
+        self.assertEqual(index.getPath("file1"), file_1)
+        self.assertEqual(index.getPath("tata/tutu/file2"), sub_file)
+        self.assertEqual(index.getPath("tata/file2"), None)
+        self.assertEqual(index.getAllPath("file1"), [file_1, file_2])
+        self.assertEqual(index.getAllPath("tata/tutu/file2"),
+                         getAllPathFromLocations("tata/tutu/file2", [dir_1, dir_2]))
+        self.assertEqual(getPath("file1", "auxiliary", use_index=True), file_1)
+
+        # a directory modification is picked up
+        new_file = self._createFile(dir_1, "tata", "file2")
+        self.assertEqual(index.getPath("tata/file2"), new_file)
+
+        # an environment modification is picked up
+        env["ELEMENTS_AUX_PATH"] = dir_2
+        self.assertEqual(index.getPath("file1"), file_2)
+        self.assertEqual(index.listFiles(dir_2), [file_2, sub_file])
+
+        del env
+
+    def testManifest(self):
+        dir_1 = self._tmpdir_1.path()
+        dir_2 = self._tmpdir_2.path()
+        self._createFile(dir_1, "file1")
+        file_2 = self._createFile(dir_2, "file2")
+        os.mkdir(os.path.join(dir_1, "tutu"))
+        os.symlink(dir_2, os.path.join(dir_1, "link"))
+        manifest_path = os.path.join(dir_1, MANIFEST_NAME)
+        open(manifest_path, "w").close()
+
+        def writeManifest(dir_time):
+            with open(manifest_path, "w") as f:
+                f.write(MANIFEST_HEADER + "\n")
+                f.write("d\t.\t%r\n" % dir_time)
+                f.write("f\tfile1\t7\t1600000000.0\n")
+                f.write("f\tfile2\t7\t1600000000.0\n")
+                f.write("l\tlink\n")
+                f.write("d\ttata\t1600000000.0\n")
+                f.write("f\ttata/file3\t7\t1600000000.0\n")
+                f.write("d\ttutu\t%r\n" % os.stat(os.path.join(dir_1, "tutu")).st_mtime)
+
+        # the manifests are not used by default
+        writeManifest(os.stat(dir_1).st_mtime)
+        self.assertEqual(getManifest(dir_1), None)
+
+        enableManifest(True)
+        try:
+            manifest = getManifest(dir_1)
+            self.assertEqual(manifest.getEntry("file2"), (7, 1600000000.0))
+            self.assertTrue(manifest.exists("file1"))
+            self.assertTrue(manifest.exists("tutu"))
+            self.assertFalse(manifest.exists("tutu/file4"))
+            # the names below a link or a changed directory are not answered
+            self.assertEqual(manifest.exists("link/file2"), None)
+            self.assertEqual(manifest.exists("tata/file3"), None)
+            self.assertEqual(manifest.listFiles(), None)
+            self.assertEqual(getManifest(dir_2), None)
+
+            # the manifest is used for an unchanged directory
+            self.assertEqual(getAllPathFromLocations("file2", [dir_1, dir_2]),
+                             [os.path.join(dir_1, "file2"), file_2])
+            self.assertEqual(getAllPathFromLocations("link/file2", [dir_1]),
+                             [os.path.join(dir_1, "link", "file2")])
+            self.assertEqual(getAllPathFromLocations("tata/file3", [dir_1]), [])
+
+            # and the filesystem for a stale one
+            writeManifest(1600000000.0)
+            clearManifestCache()
+            self.assertEqual(getManifest(dir_1).exists("file2"), None)
+            self.assertEqual(getAllPathFromLocations("file2", [dir_1, dir_2]), [file_2])
+        finally:
+            enableManifest(False)
+            clearManifestCache()
+
+    def testBatchLookup(self):
+        dir_1 = self._tmpdir_1.path()
+        dir_2 = self._tmpdir_2.path()
+        file_1 = self._createFile(dir_1, "file1")
+        file_2 = self._createFile(dir_2, "file1")
+        sub_file = self._createFile(dir_2, "tata", "file2")
+
+        names = ["file1", "tata/file2", "file3"]
+        all_paths = getAllPathsFromLocations(names, [dir_1, dir_2])
+        self.assertEqual(list(all_paths.keys()), names)
+        self.assertEqual(all_paths["file1"], [file_1, file_2])
+        self.assertEqual(all_paths["tata/file2"], [sub_file])
+        self.assertEqual(all_paths["file3"], [])
+
+        env = TempEnv()
+        env["ELEMENTS_AUX_PATH"] = os.pathsep.join([dir_1, dir_2])
+        paths = getPaths(names, "auxiliary", raise_exception=False)
+        self.assertEqual(paths["file1"], file_1)
+        self.assertEqual(paths["tata/file2"], sub_file)
+        self.assertEqual(paths["file3"], None)
+        self.assertRaises(Exception, getPaths, names, "auxiliary")
+        del env
+
+    def testLookupCache(self):
+        dir_1 = self._tmpdir_1.path()
+        env = TempEnv()
+        env["ELEMENTS_AUX_PATH"] = dir_1
+        setLookupCacheTTL(3600)
+        resetLookupStats()
+
+        self.assertEqual(getPath("file1", "auxiliary", raise_exception=False), None)
+        file_1 = self._createFile(dir_1, "file1")
+        # the miss is cached
+        self.assertEqual(getPath("file1", "auxiliary", raise_exception=False), None)
+        stats = getLookupStats()
+        self.assertEqual(stats["lookups"], 2)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["cache_hits"], 1)
+        self.assertTrue(stats["stat_calls"] > 0)
+
+        invalidateLookupCache("auxiliary")
+        self.assertEqual(getPath("file1", "auxiliary"), file_1)
+        self.assertEqual(getLookupStats()["hits"], 1)
+
+        setLookupCacheTTL(0)
+        del env
+
+    def testGetUniqueLocations(self):
+        dir_1 = self._tmpdir_1.path()
+        dir_2 = self._tmpdir_2.path()
+        link_1 = os.path.join(dir_2, "link")
+        os.symlink(dir_1, link_1)
+        locations = [dir_1, "/non/existing", dir_2, link_1,
+                     dir_1 + os.sep, "/non/existing/", dir_2]
+        self.assertEqual(getUniqueLocations(locations, use_cache=False),
+                         [dir_1, "/non/existing", dir_2])
+        self.assertEqual(getUniqueLocations(locations),
+                         [dir_1, "/non/existing", dir_2])
+
+        # the cached relative locations follow the current directory
+        old_dir = os.getcwd()
+        try:
+            os.chdir(dir_1)
+            self.assertEqual(getUniqueLocations([dir_1, "."]), [dir_1])
+            os.chdir(dir_2)
+            self.assertEqual(getUniqueLocations([dir_1, "."]), [dir_1, "."])
+        finally:
+            os.chdir(old_dir)
+
+    def testCompactLocations(self):
+        dir_1 = self._tmpdir_1.path()
+        dir_2 = self._tmpdir_2.path()
+        locations = [dir_1, "", "/non/existing", dir_2, dir_1, "", dir_2 + os.sep]
+        self.assertEqual(compactLocations(locations),
+                         ([dir_1, "", "/non/existing", dir_2], 3))
+        self.assertEqual(compactLocations(locations, prune=True),
+                         ([dir_1, "", dir_2], 4))
+
+    def testWhichCache(self):
+        dir_1 = self._tmpdir_1.path()
+        env = TempEnv()
+        env["PATH"] = os.pathsep.join([dir_1, env["PATH"]])
+        self.assertEqual(which("elements_which_test"), None)
+        exe_file = self._createFile(dir_1, "elements_which_test")
+        os.chmod(exe_file, 0o755)
+        getWhichIndex().refresh()
+        self.assertEqual(which("elements_which_test"), exe_file)
+        result = whichAll(["elements_which_test", "elements_which_none"])
+        self.assertEqual(list(result.items()), [("elements_which_test", exe_file),
+                                                ("elements_which_none", None)])
+        del env
+
+    def testPathSearch(self):
+        root = self._tmpdir_1.path()
+        files = [self._createFile(root, "file1"),
+                 self._createFile(root, "tata", "file1"),
+                 self._createFile(root, "tata", "tutu", "file1"),
+                 self._createFile(root, "titi", "file2.txt")]
+
+        for workers in [1, 4]:
+            self.assertEqual(sorted(pathSearch("file1", root, workers=workers)), sorted(files[:3]))
+            self.assertEqual(sorted(pathSearch("file1", root, max_depth=1, workers=workers)),
+                             sorted(files[:2]))
+            self.assertEqual(list(pathSearch("*.txt", root, workers=workers)), files[3:])
+            self.assertEqual(list(pathSearch("tutu", root, workers=workers)),
+                             [os.path.dirname(files[2])])
+
+        # the search can be stopped at the first match
+        search = pathSearch("file1", root, workers=4)
+        self.assertTrue(next(search) in files)
+        search.close()
+
+    def _createLinkerCache(self, cache_file, libraries, flags=None):
+        strings = b""
+        entries = []
+        header_size = 48
+        entry_size = 24
+        string_offset = header_size + entry_size * len(libraries)
+        if flags is None:
+            flags = [getLinkerCacheFlags() or 0x0303] * len(libraries)
+        for (name, path), entry_flags in zip(libraries, flags):
+            key = string_offset + len(strings)
+            strings += name.encode() + b"\0"
+            value = string_offset + len(strings)
+            strings += path.encode() + b"\0"
+            entries.append(struct.pack("=iIIIQ", entry_flags, key, value, 0, 0))
+        with open(cache_file, "wb") as f:
+            f.write(struct.pack("=20sII4xI12x", b"glibc-ld.so.cache1.1", len(libraries), len(strings), 0))
+            f.write(b"".join(entries))
+            f.write(strings)
+
+    def testLibraryResolver(self):
+        dir_1 = self._tmpdir_1.path()
+        dir_2 = self._tmpdir_2.path()
+        for n in ["libfoo.so", "libfoo.so.1", "libfoo.so.1.2", "libfoo.so.1.10"]:
+            self._createFile(dir_1, n)
+        cache_file = os.path.join(dir_2, "ld.so.cache")
+        self._createLinkerCache(cache_file, [("libbar.so.2", "/opt/lib/libbar.so.2"),
+                                             ("libbar.so.1", "/opt/lib/libbar.so.1")])
+
+        self.assertEqual(list(readLinkerCache(cache_file).keys()), ["libbar.so.2", "libbar.so.1"])
+        self.assertEqual(readLinkerCache(os.path.join(dir_2, "none")), {})
+
+        env = TempEnv()
+        env[VARIABLE["library"]] = dir_1
+        resolver = LibraryResolver(cache_file)
+        self.assertEqual(resolver.getPath("libfoo.so.1"), os.path.join(dir_1, "libfoo.so.1"))
+        self.assertEqual(resolver.getPath("libbar.so.1"), "/opt/lib/libbar.so.1")
+        self.assertEqual(resolver.getPath("libnone.so"), None)
+        self.assertEqual(resolver.findLibrary("libfoo.so*"), os.path.join(dir_1, "libfoo.so.1.10"))
+        self.assertEqual(resolver.findLibrary("libbar.so*"), "/opt/lib/libbar.so.2")
+
+        # the misses are only kept by the lookup cache
+        self.assertEqual(resolver.findLibrary("libnew.so*"), None)
+        new_lib = self._createFile(dir_1, "libnew.so")
+        self.assertEqual(resolver.getPath("libnew.so"), new_lib)
+        self.assertEqual(resolver.findLibrary("libnew.so*"), new_lib)
+        os.remove(new_lib)
+        setLookupCacheTTL(3600)
+        try:
+            self.assertEqual(resolver.getPath("libnew.so"), None)
+            self._createFile(dir_1, "libnew.so")
+            self.assertEqual(resolver.getPath("libnew.so"), None)
+            invalidateLookupCache("library")
+            self.assertEqual(resolver.getPath("libnew.so"), new_lib)
+        finally:
+            setLookupCacheTTL(0)
+        del env
+
+    def testLinkerCacheFlags(self):
+        flags = getLinkerCacheFlags()
+        if flags is None:
+            self.skipTest("Unknown platform")
+        cache_file = os.path.join(self._tmpdir_1.path(), "ld.so.cache")
+        # the same library for another architecture of a multilib system
+        other_flags = 0x0003 if flags != 0x0003 else 0x0303
+        self._createLinkerCache(cache_file, [("libbar.so.1", "/opt/lib32/libbar.so.1"),
+                                             ("libbar.so.1", "/opt/lib/libbar.so.1")],
+                                [other_flags, flags])
+        self.assertEqual(readLinkerCache(cache_file)["libbar.so.1"], ["/opt/lib/libbar.so.1"])
+        self.assertEqual(readLinkerCache(cache_file, flags=-1)["libbar.so.1"],
+                         ["/opt/lib32/libbar.so.1", "/opt/lib/libbar.so.1"])
+        self.assertEqual(LibraryResolver(cache_file).getPath("libbar.so.1"), "/opt/lib/libbar.so.1")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,131 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import unittest
+
+import os
+import sys
+import gc
+
+from ElementsKernel.Temporary import TempDir, TempEnv
+from ElementsKernel.Pipeline import Pipeline, DataStore, getDataStore, readPipelineFile
+from ElementsKernel import Exit
+
+PRODUCER_CONTENT = """
+import argparse
+from ElementsKernel.Pipeline import getDataStore
+
+def defineSpecificProgramOptions():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=2, help='Number of values')
+    return parser
+
+def mainMethod(args):
+    getDataStore().put("values", list(range(args.count)))
+    return 0
+"""
+
+CONSUMER_CONTENT = """
+import argparse
+from ElementsKernel.Pipeline import getDataStore
+
+def defineSpecificProgramOptions():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--factor', type=int, default=1, help='Multiplication factor')
+    return parser
+
+def mainMethod(args):
+    values = getDataStore().get("values")
+    if values is None:
+        return 66
+    getDataStore().put("result", [args.factor * v for v in values])
+    return 0
+"""
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="tempdir")
+        self._env = TempEnv()
+        for name, content in [("PipelineTestProducer", PRODUCER_CONTENT),
+                              ("PipelineTestConsumer", CONSUMER_CONTENT)]:
+            with open(os.path.join(self._tmpdir.path(), name + ".py"), "w") as f:
+                f.write(content)
+        self._bin_dir = os.path.join(self._tmpdir.path(), "bin")
+        os.mkdir(self._bin_dir)
+        sys.path.insert(0, self._tmpdir.path())
+
+    def tearDown(self):
+        sys.path.remove(self._tmpdir.path())
+        for name in ["PipelineTestProducer", "PipelineTestConsumer"]:
+            sys.modules.pop(name, None)
+        gc.collect()
+        del self._env
+        del self._tmpdir
+        unittest.TestCase.tearDown(self)
+
+    def _createPipeline(self):
+        return Pipeline(os.path.join(self._bin_dir, "PipelineTest"),
+                        search_dirs=[self._tmpdir.path()],
+                        use_config_file=False)
+
+    def testDataStore(self):
+        store = DataStore()
+        store.put("a", 1)
+        store.put("b", [2])
+        self.assertTrue("a" in store)
+        self.assertEqual(store.getNames(), ["a", "b"])
+        self.assertEqual(store.pop("a"), 1)
+        self.assertEqual(store.get("a", 3), 3)
+        store.clear()
+        self.assertEqual(store.getNames(), [])
+
+    def testRun(self):
+        pipeline = self._createPipeline()
+        pipeline.addStage("PipelineTestProducer", ["--count", "3"])
+        pipeline.addStage("PipelineTestConsumer", ["--factor", "10"])
+        self.assertEqual(pipeline.run(), Exit.Code["OK"])
+        self.assertEqual(pipeline.getDataStore().get("result"), [0, 10, 20])
+        # the store of the pipeline is only active during the run
+        self.assertFalse("result" in getDataStore())
+
+    def testFailedStage(self):
+        pipeline = self._createPipeline()
+        pipeline.addStage("PipelineTestConsumer")
+        pipeline.addStage("PipelineTestProducer")
+        self.assertEqual(pipeline.run(), Exit.Code["NOINPUT"])
+        self.assertFalse("values" in pipeline.getDataStore())
+
+    def testReadPipelineFile(self):
+        pipeline_file = os.path.join(self._tmpdir.path(), "pipeline.txt")
+        with open(pipeline_file, "w") as f:
+            f.write("# stages\nPipelineTestProducer --count 4\n\nPipelineTestConsumer --factor '2'\n")
+        self.assertEqual(readPipelineFile(pipeline_file),
+                         [("PipelineTestProducer", ["--count", "4"]),
+                          ("PipelineTestConsumer", ["--factor", "2"])])
+
+
+if __name__ == '__main__':
+    unittest.main()
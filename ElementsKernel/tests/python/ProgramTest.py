@@ -0,0 +1,507 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import unittest
+
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import gc
+import json
+import pstats
+import tracemalloc
+
+from ElementsKernel.Temporary import TempDir, TempEnv
+from ElementsKernel.Program import Program, parseCpuList, parsePositiveFloat
+from ElementsKernel.ResultCache import ResultCache
+from ElementsKernel import Exit
+
+APP_MODULE_CONTENT = """
+import argparse
+import sys
+import time
+import %s
+
+def defineSpecificProgramOptions():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--value', type=int, default=1, help='A value')
+    parser.add_argument('--input', help='Input file')
+    parser.add_argument('--output', help='Output file')
+    return parser
+
+RUNS = []
+
+def defineCachedFileOptions():
+    return ["input"], ["output"]
+
+def mainMethod(args):
+    RUNS.append(args)
+    if args.output:
+        with open(args.input) as in_file, open(args.output, "w") as out_file:
+            out_file.write(in_file.read().upper())
+    if args.value == -2:
+        time.sleep(60)
+    if args.value < 0:
+        raise ValueError("Negative value")
+    if args.value == 7:
+        sys.exit(3)
+    if args.value > 10:
+        return 2
+    return 0
+
+def splitWork(args):
+    return [argparse.Namespace(value=args.value + i, input=None, output=None) for i in range(4)]
+
+def mergeResults(results):
+    return max(results)
+"""
+
+ASYNC_MODULE_CONTENT = """
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+def defineSpecificProgramOptions():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--interrupt', action='store_true', help='Send SIGINT')
+    parser.add_argument('--subprocess', action='store_true', help='Run a subprocess')
+    return parser
+
+async def mainMethod(args):
+    if args.subprocess:
+        process = await asyncio.create_subprocess_exec(sys.executable, "-c", "import sys; sys.exit(3)")
+        return await process.wait()
+    loop = asyncio.get_event_loop()
+    values = await asyncio.gather(*[loop.run_in_executor(None, abs, -i) for i in range(4)])
+    if args.interrupt:
+        os.kill(os.getpid(), signal.SIGINT)
+        await asyncio.sleep(10)
+    return sum(values) - 6
+"""
+
+CONFLICT_MODULE_CONTENT = """
+import argparse
+import %s
+
+def defineSpecificProgramOptions():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-j', '--jobs', type=int, default=8, help='Number of threads')
+    parser.add_argument('--threads', help='Thread names')
+    return parser
+
+def mainMethod(args):
+    return 0 if (args.jobs, args.threads) == (3, "a,b") else 1
+"""
+
+SIGNALS_MODULE_CONTENT = """
+import argparse
+import os
+import signal
+import time
+
+def defineSpecificProgramOptions():
+    return argparse.ArgumentParser()
+
+def busyLoop(duration):
+    end = time.time() + duration
+    while time.time() < end:
+        pass
+
+def mainMethod(args):
+    os.kill(os.getpid(), signal.SIGUSR1)
+    os.kill(os.getpid(), signal.SIGUSR2)
+    busyLoop(0.3)
+    os.kill(os.getpid(), signal.SIGUSR2)
+    return 0
+"""
+
+
+class _ListHandler(logging.Handler):
+    """ Collect the formatted log messages """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class ProgramTest(unittest.TestCase):
+
+    _counter = 0
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="tempdir")
+        self._env = TempEnv()
+        self._cache_dir = os.path.join(self._tmpdir.path(), "cache")
+        self._env["ELEMENTS_CONF_CACHE_DIR"] = self._cache_dir
+        ProgramTest._counter += 1
+        self._module_name = "ProgramTestApp%d" % ProgramTest._counter
+        self._dep_name = self._module_name + "Dep"
+        with open(os.path.join(self._tmpdir.path(), self._module_name + ".py"), "w") as f:
+            f.write(APP_MODULE_CONTENT % self._dep_name)
+        with open(os.path.join(self._tmpdir.path(), self._dep_name + ".py"), "w") as f:
+            f.write("import os\nTHREADS = os.environ.get('OMP_NUM_THREADS')\n")
+        self._bin_dir = os.path.join(self._tmpdir.path(), "bin")
+        os.mkdir(self._bin_dir)
+        sys.path.insert(0, self._tmpdir.path())
+        self._orig_argv = sys.argv
+        self._handler = _ListHandler()
+        logging.getLogger('ElementsProgram').addHandler(self._handler)
+
+    def tearDown(self):
+        logging.getLogger('ElementsProgram').removeHandler(self._handler)
+        sys.argv = self._orig_argv
+        sys.path.remove(self._tmpdir.path())
+        sys.modules.pop(self._module_name, None)
+        sys.modules.pop(self._dep_name, None)
+        # the programs restore their environment when they are collected:
+        # this must not happen in the middle of the next test
+        gc.collect()
+        del self._env
+        del self._tmpdir
+        unittest.TestCase.tearDown(self)
+
+    def _runProgram(self, *argv, **kwargs):
+        sys.argv = [os.path.join(self._bin_dir, self._module_name)] + list(argv)
+        program = Program(self._module_name, search_dirs=[self._tmpdir.path()],
+                          original_path=sys.argv[0],
+                          use_config_file=kwargs.get("use_config_file", False),
+                          elements_loglevel=logging.INFO)
+        return program, program.runProgram()
+
+    def testProfileStartup(self):
+        program, exit_code = self._runProgram("--profile-startup")
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        phases = program._timer.getPhases()
+        for name in ["application module import", "environment bootstrap",
+                     "argument parsing (generic pass)", "argument parsing (final pass)",
+                     "mainMethod"]:
+            self.assertTrue(name in phases)
+        self.assertTrue(self._dep_name in program._import_timer.getRecords())
+        self.assertTrue("# Start-up profile" in self._handler.messages)
+
+    def testNoProfileStartup(self):
+        program, exit_code = self._runProgram("--value", "2")
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        self.assertTrue(program._import_timer is None)
+        self.assertFalse("# Start-up profile" in self._handler.messages)
+
+    def testProfileOutput(self):
+        output_file = os.path.join(self._tmpdir.path(), "main.pstats")
+        _, exit_code = self._runProgram("--profile-output", output_file)
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        self.assertTrue(os.path.isfile(output_file))
+        stats = pstats.Stats(output_file)
+        self.assertTrue([f for f in stats.stats if f[2] == "mainMethod"])
+
+    def testTraceMemory(self):
+        _, exit_code = self._runProgram("--trace-memory")
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertTrue([m for m in self._handler.messages if m.startswith("# Traced memory")])
+
+    def testRunRecord(self):
+        record_file = os.path.join(self._tmpdir.path(), "run.json")
+        _, exit_code = self._runProgram("--run-record", record_file)
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        with open(record_file) as f:
+            record = json.load(f)
+        self.assertEqual(record["exit_code"], Exit.Code["OK"])
+        self.assertEqual(record["module"], self._module_name)
+        self.assertTrue(record["wall_time"] > 0.0)
+        for who in ("self", "children"):
+            self.assertTrue("max_rss_kib" in record[who])
+            self.assertTrue("voluntary_context_switches" in record[who])
+        self.assertTrue(record["self"]["max_rss_kib"] > 0)
+
+    def testBatch(self):
+        batch_file = os.path.join(self._tmpdir.path(), "batch.txt")
+        with open(batch_file, "w") as f:
+            f.write("# comment\n")
+            f.write("--value 3\n")
+            f.write("\n")
+            f.write("--value 11\n")
+            f.write("--value -1\n")
+            f.write("--value 'not an int'\n")
+            f.write("--value 7\n")
+            f.write("--value 4\n")
+        program, exit_code = self._runProgram("--batch", batch_file)
+        self.assertEqual(exit_code, Exit.Code["NOT_OK"])
+        results = [(r[0], r[2]) for r in program.getBatchResults()]
+        self.assertEqual(results, [(2, Exit.Code["OK"]), (4, 2), (5, Exit.Code["NOT_OK"]),
+                                   (6, Exit.Code["USAGE"]), (7, 3), (8, Exit.Code["OK"])])
+        self.assertEqual(program.getBatchResults()[3][1], ["--value", "not an int"])
+
+    def testBatchResultCache(self):
+        cache_dir = os.path.join(self._tmpdir.path(), "results")
+        input_file = os.path.join(self._tmpdir.path(), "input.txt")
+        output_file = os.path.join(self._tmpdir.path(), "output.txt")
+        with open(input_file, "w") as f:
+            f.write("abc")
+        batch_file = os.path.join(self._tmpdir.path(), "batch.txt")
+        with open(batch_file, "w") as f:
+            f.write("--input %s --output %s\n" % (input_file, output_file) * 2)
+        program, exit_code = self._runProgram("--batch", batch_file, "--result-cache", cache_dir)
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        # the second item is restored from the cache
+        self.assertEqual(len(program._app_module.RUNS), 1)
+
+    def testBatchMissingFile(self):
+        _, exit_code = self._runProgram("--batch", os.path.join(self._tmpdir.path(), "missing.txt"))
+        self.assertEqual(exit_code, Exit.Code["NOINPUT"])
+
+    @unittest.skipUnless(sys.version_info >= (3, 7), "Python 3.7 needed")
+    def testProcesses(self):
+        _, exit_code = self._runProgram("--processes", "2", "--value", "1")
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        _, exit_code = self._runProgram("--processes", "2", "--value", "9")
+        self.assertEqual(exit_code, 2)
+
+    @unittest.skipUnless(sys.version_info >= (3, 7), "Python 3.7 needed")
+    def testProcessesFailure(self):
+        _, exit_code = self._runProgram("--processes", "2", "--value", "-1")
+        self.assertEqual(exit_code, Exit.Code["NOT_OK"])
+        failures = [m for m in self._handler.messages if m.startswith("The work item")]
+        self.assertEqual(failures, ["The work item 0 failed: cancelling the remaining ones"])
+        # the running items are stopped too
+        start = time.time()
+        _, exit_code = self._runProgram("--processes", "2", "--value", "-3")
+        self.assertEqual(exit_code, Exit.Code["NOT_OK"])
+        self.assertTrue(time.time() - start < 30)
+
+    def testGenericOptionConflict(self):
+        with open(os.path.join(self._tmpdir.path(), self._module_name + ".py"), "w") as f:
+            f.write(CONFLICT_MODULE_CONTENT % self._dep_name)
+        if "OMP_NUM_THREADS" in self._env:
+            del self._env["OMP_NUM_THREADS"]
+        program, exit_code = self._runProgram("-j", "3", "--threads", "a,b")
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        # the options of the program are not the generic ones
+        self.assertEqual(program._generic_options.threads, None)
+        self.assertFalse("OMP_NUM_THREADS" in os.environ)
+
+    def testConfigFileCache(self):
+        config_file = os.path.join(self._tmpdir.path(), "app.conf")
+        with open(config_file, "w") as f:
+            f.write("# comment\nvalue = 12  # a comment\n")
+        program, exit_code = self._runProgram("--config-file", config_file, use_config_file=True)
+        self.assertEqual(exit_code, 2)
+        self.assertEqual(len(os.listdir(self._cache_dir)), 1)
+        self.assertEqual(program._config_options, ["--value", "12"])
+
+        # the cached tokens are used
+        cache_file = os.path.join(self._cache_dir, os.listdir(self._cache_dir)[0])
+        with open(cache_file, "w") as f:
+            json.dump(["--value", "5"], f)
+        program, exit_code = self._runProgram("--config-file", config_file, use_config_file=True)
+        self.assertEqual(exit_code, Exit.Code["OK"])
+
+        # a modified file is parsed again
+        with open(config_file, "w") as f:
+            f.write("value = 13\n")
+        program, exit_code = self._runProgram("--config-file", config_file, use_config_file=True)
+        self.assertEqual(program._config_options, ["--value", "13"])
+        self.assertEqual(exit_code, 2)
+
+    def testVariableToOptionName(self):
+        parser = argparse.ArgumentParser()
+        parser.add_argument('stem', nargs='?')
+        parser.add_argument('-v', '--verbose-level', dest='level')
+        parser.add_argument('--first', dest='shared')
+        parser.add_argument('--second-option', dest='shared')
+        all_options = parser.parse_args(['-v', '2'])
+        names = Program._getVariableToOptionName(all_options, parser)
+        self.assertEqual(names, {'stem': 'stem', 'level': 'verbose-level', 'shared': 'first'})
+
+    def testResultCache(self):
+        cache_dir = os.path.join(self._tmpdir.path(), "results")
+        input_file = os.path.join(self._tmpdir.path(), "input.txt")
+        output_file = os.path.join(self._tmpdir.path(), "output.txt")
+        with open(input_file, "w") as f:
+            f.write("abc")
+        argv = ["--result-cache", cache_dir, "--input", input_file, "--output", output_file]
+
+        program, exit_code = self._runProgram(*argv)
+        runs = program._app_module.RUNS
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        self.assertEqual(len(runs), 1)
+
+        # identical run: the output is restored without calling the mainMethod
+        os.remove(output_file)
+        _, exit_code = self._runProgram(*argv)
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        self.assertEqual(len(runs), 1)
+        with open(output_file) as f:
+            self.assertEqual(f.read(), "ABC")
+
+        # the input content or the options changed
+        with open(input_file, "w") as f:
+            f.write("abcd")
+        self._runProgram(*argv)
+        self.assertEqual(len(runs), 2)
+        self._runProgram(*(argv + ["--value", "3"]))
+        self.assertEqual(len(runs), 3)
+
+        # the failed runs are not stored
+        self._runProgram(*(argv + ["--value", "12"]))
+        self._runProgram(*(argv + ["--value", "12"]))
+        self.assertEqual(len(runs), 5)
+
+        # a relative output is restored in the current directory
+        argv = ["--result-cache", cache_dir, "--input", input_file, "--output", "relative.txt"]
+        orig_dir = os.getcwd()
+        try:
+            for sub_dir in ("a", "b"):
+                os.mkdir(os.path.join(self._tmpdir.path(), sub_dir))
+                os.chdir(os.path.join(self._tmpdir.path(), sub_dir))
+                _, exit_code = self._runProgram(*argv)
+                self.assertEqual(exit_code, Exit.Code["OK"])
+                with open("relative.txt") as f:
+                    self.assertEqual(f.read(), "ABCD")
+        finally:
+            os.chdir(orig_dir)
+        self.assertEqual(len(runs), 6)
+
+        # the version of the program is part of the key
+        cache = ResultCache(cache_dir)
+        self.assertNotEqual(cache.getKey(self._module_name, {}, [], "Project 1.0"),
+                            cache.getKey(self._module_name, {}, [], "Project 1.1"))
+
+    def testBootstrapCompaction(self):
+        conf_dir = os.path.join(self._tmpdir.path(), "conf")
+        os.mkdir(conf_dir)
+        other_dir = os.path.join(self._tmpdir.path(), "other")
+        os.mkdir(other_dir)
+        missing_dir = os.path.join(self._tmpdir.path(), "missing")
+        self._env["ELEMENTS_CONF_PATH"] = os.pathsep.join([other_dir, conf_dir, missing_dir,
+                                                           other_dir, conf_dir])
+        program, _ = self._runProgram()
+        # the conf sub-directory of the search path is already there
+        share_conf_dir = os.path.join(self._tmpdir.path(), "share", "conf")
+        self.assertEqual(os.environ["ELEMENTS_CONF_PATH"],
+                         os.pathsep.join([other_dir, conf_dir, missing_dir, share_conf_dir]))
+        self.assertEqual(program.getBootstrapStats()["ELEMENTS_CONF_PATH"], 2)
+        # a nested bootstrap does not change the variables
+        environment = dict(os.environ)
+        program._bootStrapEnvironment()
+        self.assertEqual(dict(os.environ), environment)
+        self.assertEqual(program.getBootstrapStats()["ELEMENTS_CONF_PATH"], 0)
+        del program
+        gc.collect()
+
+        self._env["ELEMENTS_BOOTSTRAP_PRUNE"] = "1"
+        program, _ = self._runProgram()
+        self.assertEqual(os.environ["ELEMENTS_CONF_PATH"], os.pathsep.join([other_dir, conf_dir]))
+        self.assertEqual(program.getBootstrapStats()["ELEMENTS_CONF_PATH"], 3)
+
+    def testAsyncMainMethod(self):
+        with open(os.path.join(self._tmpdir.path(), self._module_name + ".py"), "w") as f:
+            f.write(ASYNC_MODULE_CONTENT)
+        _, exit_code = self._runProgram()
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        start = time.time()
+        _, exit_code = self._runProgram("--interrupt")
+        self.assertEqual(exit_code, Exit.Code["NOT_OK"])
+        self.assertTrue(time.time() - start < 5)
+        self.assertEqual(signal.getsignal(signal.SIGINT), signal.default_int_handler)
+
+    def testAsyncSubprocess(self):
+        with open(os.path.join(self._tmpdir.path(), self._module_name + ".py"), "w") as f:
+            f.write(ASYNC_MODULE_CONTENT)
+        _, exit_code = self._runProgram("--subprocess")
+        self.assertEqual(exit_code, 3)
+
+    def testDebugSignals(self):
+        with open(os.path.join(self._tmpdir.path(), self._module_name + ".py"), "w") as f:
+            f.write(SIGNALS_MODULE_CONTENT)
+        sampler_output = os.path.join(self._tmpdir.path(), "samples.collapsed")
+        old_handler = signal.getsignal(signal.SIGUSR1)
+        _, exit_code = self._runProgram("--debug-signals", "--sampler-output", sampler_output)
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        self.assertEqual(signal.getsignal(signal.SIGUSR1), old_handler)
+        self.assertTrue([m for m in self._handler.messages if m.startswith("# Stacks of the")])
+        with open(sampler_output) as f:
+            stacks = f.read().splitlines()
+        self.assertTrue([l for l in stacks if "busyLoop" in l and l.startswith("MainThread;")])
+
+    def testBatchDebugSignals(self):
+        batch_file = os.path.join(self._tmpdir.path(), "batch.txt")
+        with open(batch_file, "w") as f:
+            f.write("--value 1\n")
+        old_handler = signal.getsignal(signal.SIGUSR1)
+        _, exit_code = self._runProgram("--batch", batch_file, "--debug-signals")
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        self.assertEqual(signal.getsignal(signal.SIGUSR1), old_handler)
+
+    def testMetricsFile(self):
+        metrics_file = os.path.join(self._tmpdir.path(), "metrics.txt")
+        _, exit_code = self._runProgram("--metrics-file", metrics_file, "--metrics-interval", "0.01")
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        with open(metrics_file) as f:
+            self.assertEqual(f.read().splitlines()[-1], "# EOF")
+
+    def testParseCpuList(self):
+        self.assertEqual(parseCpuList("0-3,8, 10-11,2"), [0, 1, 2, 3, 8, 10, 11])
+        for cpu_list in ["", "a", "3-1", "-1", "1,,2"]:
+            self.assertRaises(argparse.ArgumentTypeError, parseCpuList, cpu_list)
+
+    def testParsePositiveFloat(self):
+        self.assertEqual(parsePositiveFloat("0.5"), 0.5)
+        for value in ["", "a", "0", "-1", "nan"]:
+            self.assertRaises(argparse.ArgumentTypeError, parsePositiveFloat, value)
+
+    def testThreads(self):
+        for name in ["OMP_NUM_THREADS", "MKL_NUM_THREADS"]:
+            if name in self._env:
+                del self._env[name]
+        _, exit_code = self._runProgram("--threads", "3")
+        self.assertEqual(exit_code, Exit.Code["OK"])
+        # the variables are set before the import of the application module
+        self.assertEqual(sys.modules[self._dep_name].THREADS, "3")
+        self.assertEqual(os.environ["MKL_NUM_THREADS"], "3")
+
+    @unittest.skipUnless(hasattr(os, "sched_getaffinity"), "CPU affinity not supported")
+    def testCpuAffinity(self):
+        if "OMP_NUM_THREADS" in self._env:
+            del self._env["OMP_NUM_THREADS"]
+        affinity = os.sched_getaffinity(0)
+        cpu = min(affinity)
+        try:
+            _, exit_code = self._runProgram("--cpu-affinity", str(cpu))
+            self.assertEqual(exit_code, Exit.Code["OK"])
+            self.assertEqual(os.sched_getaffinity(0), set([cpu]))
+            self.assertEqual(sys.modules[self._dep_name].THREADS, "1")
+        finally:
+            os.sched_setaffinity(0, affinity)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -202,6 +202,10 @@ option(USE_LOCAL_INSTALLAREA
        "Use local InstallArea for the Developers"
        OFF)
 
+option(ELEMENTS_FILE_MANIFESTS
+       "Write the file manifests used by the Python path lookups at installation time"
+       OFF)
+
 option(OPT_DEBUG
        "Enable optimisation for the Debug version"
        ON)
@@ -50,6 +50,14 @@ if(POLICY CMP0054)
   endif()
 endif()
 
+if(POLICY CMP0082)
+  # this policy is related to the order of the install rules of the
+  # subdirectories. It is needed to write the file manifests at the end
+  # of the installation.
+  # please run "cmake --help-policy CMP0082" for more details
+  cmake_policy(SET CMP0082 NEW)
+endif()
+
 
 if (NOT HAS_ELEMENTS_TOOLCHAIN)
   # this is the call to the preload_local_module_path is the toolchain has not been called
@@ -348,6 +356,11 @@ macro(elements_project project version)
     set(zippythondir_cmd ${PYTHON_EXECUTABLE} ${zippythondir_cmd})
   endif()
 
+  find_program(filemanifest_cmd createFileManifest.py HINTS ${binary_paths})
+  if(filemanifest_cmd)
+    set(filemanifest_cmd ${PYTHON_EXECUTABLE} ${filemanifest_cmd})
+  endif()
+
   find_program(elementsrun_cmd elementsrun.py HINTS ${binary_paths})
   if(elementsrun_cmd)
     set(elementsrun_cmd ${PYTHON_EXECUTABLE} ${elementsrun_cmd})
@@ -383,7 +396,7 @@ macro(elements_project project version)
                    thisheader_cmd thismodule_cmd
                    thismodheader_cmd
                    Boost_testmain_cmd CppUnit_testmain_cmd
-                   zippythondir_cmd elementsrun_cmd
+                   zippythondir_cmd filemanifest_cmd elementsrun_cmd
                    pythonprogramscript_cmd ctest2junit_cmd ctestxml2html_cmd)
 
 
@@ -644,6 +657,18 @@ execute_process\(COMMAND ${instmodule_cmd} --quiet ${so_version_option} ${projec
   endforeach()
   file(APPEND ${CMAKE_BINARY_DIR}/subdirs_deps.dot "}\n")
 
+  # The file manifests used by the ElementsKernel.Path lookups can only be
+  # written once the subdirectories are installed. This requires the CMP0082
+  # policy (CMake >= 3.14). They describe the whole content of the prefix:
+  # they are not written for a squeezed installation, whose prefix is shared
+  # with other projects, nor for a staged (DESTDIR) one.
+  if(filemanifest_cmd AND POLICY CMP0082 AND ELEMENTS_FILE_MANIFESTS AND NOT SQUEEZED_INSTALL)
+    install(CODE "if\(\"\$ENV{DESTDIR}\" STREQUAL \"\"\)
+  message\(STATUS \"Installing: file manifests in \${CMAKE_INSTALL_PREFIX}\"\)
+  execute_process\(COMMAND ${filemanifest_cmd} --quiet \${CMAKE_INSTALL_PREFIX} ${SCRIPT_INSTALL_SUFFIX} ${CMAKE_LIB_INSTALL_SUFFIX} ${PYTHON_INSTALL_SUFFIX} ${CONF_INSTALL_SUFFIX} ${AUX_INSTALL_SUFFIX}\)
+endif\(\)")
+  endif()
+
   # FIXME: it is not possible to produce the file python.zip at installation time
   # because the install scripts of the subdirectories are executed after those
   # of the parent project and we cannot have a post-install target because of
@@ -0,0 +1,93 @@
+""" Script module to generate the file manifests of an installation prefix
+
+For each of the given sub-directories of the prefix (bin, lib, python, conf,
+auxdir, ...), a ".ElementsManifest" file is written at its top. It contains
+one line per directory found below that sub-directory with its relative path
+and modification time, and one line per file with the relative path, the size
+and the modification time of the file. The symbolic links to directories are
+listed but not followed. This file is read by the ElementsKernel.Path module
+to answer the lookups without probing the filesystem. The directory times are
+used there to detect a stale manifest.
+
+The manifests describe the content of a whole prefix: they are not written
+for a staged installation (DESTDIR set), which only holds the files of the
+installed project.
+"""
+import os
+import sys
+from optparse import OptionParser
+
+MANIFEST_NAME = ".ElementsManifest"
+MANIFEST_HEADER = "# ElementsManifest 2"
+
+
+def collectEntries(location):
+    """ Collect the ("d", relative path, mtime), ("l", relative path) and
+    ("f", relative path, size, mtime) entries of all the directories, links
+    to directories and files below the location. The symbolic links to
+    directories are not followed. """
+    entries = []
+    for root, dirs, files in os.walk(location):
+        rel_root = os.path.relpath(root, location)
+        try:
+            entries.append(("d", rel_root, repr(os.stat(root).st_mtime)))
+        except OSError:
+            continue
+        for d in dirs:
+            if os.path.islink(os.path.join(root, d)):
+                entries.append(("l", os.path.normpath(os.path.join(rel_root, d))))
+        for f in files:
+            rel_path = os.path.normpath(os.path.join(rel_root, f))
+            if rel_path == MANIFEST_NAME:
+                continue
+            try:
+                st = os.stat(os.path.join(root, f))
+            except OSError:
+                continue
+            entries.append(("f", rel_path, str(st.st_size), repr(st.st_mtime)))
+    return sorted(entries, key=lambda e: e[1])
+
+
+def writeManifest(location, quiet=False):
+    """ Write the manifest at the top of the location. The manifest file
+    is created before the collection of the entries: its creation changes
+    the time of the location and the rewriting of its content does not. """
+    manifest_path = os.path.join(location, MANIFEST_NAME)
+    open(manifest_path, "a").close()
+    entries = collectEntries(location)
+    with open(manifest_path, "w") as f:
+        f.write(MANIFEST_HEADER + "\n")
+        for entry in entries:
+            f.write("\t".join(entry) + "\n")
+    if not quiet:
+        print("Creating %s with %d entries" % (manifest_path, len(entries)))
+
+
+def main():
+    """ main function of the script module """
+    parser = OptionParser(
+        usage="ERROR: Usage %prog <prefix> <subdir> [<subdir> ...]")
+
+    parser.add_option("-q", "--quiet", action="store_true",
+                      help="Do not print messages")
+
+    opts, args = parser.parse_args()
+
+    if len(args) < 2:
+        parser.error("wrong number of arguments: %s" % ",".join(args))
+
+    if os.environ.get("DESTDIR", ""):
+        if not opts.quiet:
+            print("Skipping the file manifests of the staged installation in %s" % os.environ["DESTDIR"])
+        sys.exit(0)
+
+    prefix = args[0]
+
+    for subdir in args[1:]:
+        location = os.path.join(prefix, subdir)
+        if os.path.isdir(location):
+            writeManifest(location, opts.quiet)
+
+
+if __name__ == '__main__':
+    main()
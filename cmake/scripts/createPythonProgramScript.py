@@ -96,17 +96,31 @@ sys.path = old_path
 # insert python path list after the env variable in sys.path
 _updateSysPath(update_list + [os.path.join(p, "python") for p in %(proj)s_SEARCH_DIRS[1:]])
 
-from ElementsKernel.Program import Program
-
-p = Program('%(MODULE_NAME)s',
-             %(proj)s_VERSION_STRING, %(proj)s_NAME,
-             %(proj)s_VCS_VERSION,
-             ELEMENTS_MODULE_NAME, ELEMENTS_MODULE_VERSION,
-             %(proj)s_SEARCH_DIRS, os.path.realpath(__file__),
-             logging.%(LogLevel)s,
-             use_config_file=%(UseConfigFile)s)
-
-exit(p.runProgram())
+program_kwargs = dict(parent_project_version=%(proj)s_VERSION_STRING,
+                      parent_project_name=%(proj)s_NAME,
+                      parent_project_vcs_version=%(proj)s_VCS_VERSION,
+                      elements_module_name=ELEMENTS_MODULE_NAME,
+                      elements_module_version=ELEMENTS_MODULE_VERSION,
+                      search_dirs=%(proj)s_SEARCH_DIRS,
+                      original_path=os.path.realpath(__file__),
+                      elements_loglevel=logging.%(LogLevel)s,
+                      use_config_file=%(UseConfigFile)s)
+
+# try first the pre-warmed fork server, if any is running
+exit_code = None
+try:
+    from ElementsKernel.ForkServer import runProgramInServer
+    exit_code = runProgramInServer('%(MODULE_NAME)s', program_kwargs)
+except Exception:  # pylint: disable=broad-except
+    # the program runs by itself
+    exit_code = None
+
+if exit_code is None:
+    from ElementsKernel.Program import Program
+    p = Program('%(MODULE_NAME)s', **program_kwargs)
+    exit_code = p.runProgram()
+
+exit(exit_code)
 """ % {'MODULE_NAME' : args.module,
        'proj' : args.project_name.upper(),
        'Proj' : args.project_name,